@@ -0,0 +1,219 @@
+"""Throughput benchmarks against the simulated reader (no Arduino needed).
+
+    python benchmarks/run.py
+    python benchmarks/run.py --sync-lines 500000 --json results.json
+    python benchmarks/run.py --baseline results.json  # Exit 1 on a regression
+
+Measures:
+
+- ingest: RFID_SCANNED lines per second through LineReader
+- sync: seconds for a SYNC_LOGS dump from START_LOGS to the committed store
+- table_load: seconds for RFIDApp.populate_logs to load the synced logs
+- event_loop: GUI event-loop lateness while a reader streams scans
+
+The GUI benchmarks need PyQt6 and run offscreen; they are skipped without it.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rfid.protocol import LineReader, open_port, SYNC_LOGS  # noqa: E402
+from rfid.simulator import SimulatedReader, serve_pty, serve_tcp  # noqa: E402
+from rfid.storage import open_log_store  # noqa: E402
+from rfid.sync import LogSync  # noqa: E402
+
+# Metric name -> True if higher is better
+HIGHER_IS_BETTER = {
+    "ingest_lines_per_s": True,
+    "ingest_dropped": False,
+    "sync_s": False,
+    "sync_lines_per_s": True,
+    "table_load_s": False,
+    "event_loop_p50_ms": False,
+    "event_loop_p99_ms": False,
+    "event_loop_max_ms": False,
+}
+
+
+def serve_simulator(sim):
+    """Serve ``sim`` and return the port name to open.
+
+    A pty behaves like a real serial port. pyserial reads socket:// one byte
+    at a time, so TCP (the only option on Windows) gives lower numbers.
+    """
+    return serve_pty(sim) if hasattr(os, "openpty") else serve_tcp(sim)
+
+
+class Reader:
+    """A LineReader on its own thread, as the GUI and collector run it."""
+
+    def __init__(self, port, **callbacks):
+        self.available = threading.Event()
+        self.line_reader = LineReader(port, on_lines=self.available.set, **callbacks)
+        self.stop = threading.Event()
+        self.thread = threading.Thread(target=self.line_reader.run, args=(self.stop.is_set,), daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.stop.set()
+        self.thread.join()
+        self.line_reader.serial_port.close()
+
+
+def bench_ingest(lines):
+    sim = SimulatedReader(log_lines=0, seed=1)
+    reader = Reader(open_port(serve_simulator(sim)))
+    received = 0
+    started = time.perf_counter()
+    threading.Thread(target=sim.scan_burst, args=(lines,), daemon=True).start()
+    deadline = started + 60
+    while received + reader.line_reader.dropped_lines < lines and time.perf_counter() < deadline:
+        if reader.available.wait(0.1):
+            reader.available.clear()
+            received += len(reader.line_reader.drain())
+    elapsed = time.perf_counter() - started
+    reader.close()
+    sim.stop()
+    return {
+        "ingest_lines_per_s": (received + reader.line_reader.dropped_lines) / elapsed,
+        "ingest_dropped": reader.line_reader.dropped_lines,
+    }
+
+
+def bench_sync(lines, store):
+    sim = SimulatedReader(log_lines=lines, seed=1)
+    finished = threading.Event()
+    result = {}
+    reader = Reader(
+        open_port(serve_simulator(sim)),
+        on_sync_finished=lambda success, error: (result.update(success=success, error=error), finished.set()),
+    )
+    started = time.perf_counter()
+    reader.line_reader.start_log_sync(LogSync(store, reader_id="simulator", inactivity_timeout=30))
+    reader.line_reader.write(SYNC_LOGS)
+    finished.wait(600)
+    elapsed = time.perf_counter() - started
+    reader.close()
+    sim.stop()
+    if not result.get("success"):
+        raise RuntimeError(f"Log sync failed: {result.get('error', 'timed out')}")
+    return {"sync_s": elapsed, "sync_lines_per_s": lines / elapsed}
+
+
+def bench_gui(store, scans, duration):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    try:
+        from PyQt6.QtCore import QElapsedTimer, QTimer
+        from PyQt6.QtWidgets import QApplication
+    except ImportError:
+        print("PyQt6 not installed, skipping GUI benchmarks", file=sys.stderr)
+        return {}
+    import main
+
+    app = QApplication.instance() or QApplication([])
+    window = main.RFIDApp()  # Opens logs.db in the current (temporary) directory
+    window.log_store.close()
+    window.log_store = store
+
+    started = time.perf_counter()
+    window.populate_logs()
+    results = {"table_load_s": time.perf_counter() - started}
+
+    # Lateness of a 10 ms timer while a reader streams scans into the window
+    sim = SimulatedReader(log_lines=0, seed=1)
+    window.readers.connect_reader(serve_simulator(sim))
+    threading.Thread(target=sim.scan_burst, args=(scans,), kwargs={"rate": scans / duration}, daemon=True).start()
+
+    lateness = []
+    clock = QElapsedTimer()
+    clock.start()
+    timer = QTimer()
+    timer.setInterval(10)
+    expected = [10]
+
+    def tick():
+        lateness.append(max(0, clock.elapsed() - expected[0]))
+        expected[0] = clock.elapsed() + 10
+
+    timer.timeout.connect(tick)
+    timer.start()
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        app.processEvents()
+        time.sleep(0.001)
+    timer.stop()
+    sim.stop()
+    window.close()
+
+    lateness.sort()
+    results.update(
+        event_loop_p50_ms=statistics.median(lateness),
+        event_loop_p99_ms=lateness[int(len(lateness) * 0.99)],
+        event_loop_max_ms=lateness[-1],
+    )
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Return the metrics that are more than ``tolerance`` worse than ``baseline``."""
+    regressions = []
+    for name, value in results.items():
+        base = baseline.get(name)
+        if not base or name not in HIGHER_IS_BETTER:
+            continue
+        change = (value - base) / base
+        if (-change if HIGHER_IS_BETTER[name] else change) > tolerance:
+            regressions.append(f"{name}: {value:,.2f} vs {base:,.2f} ({change:+.0%})")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--ingest-lines", type=int, default=100000, help="RFID_SCANNED lines in the ingest burst.")
+    parser.add_argument("--sync-lines", type=int, default=200000, help="Log lines in the SYNC_LOGS dump.")
+    parser.add_argument("--store", choices=["sqlite", "segments", "text"], default="sqlite", help="Log store for sync and table load.")
+    parser.add_argument("--scans", type=int, default=2000, help="Scans streamed during the event-loop benchmark.")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds of the event-loop benchmark.")
+    parser.add_argument("--no-gui", action="store_true", help="Skip the table-load and event-loop benchmarks.")
+    parser.add_argument("--json", metavar="FILE", help="Write the results to FILE.")
+    parser.add_argument("--baseline", metavar="FILE", help="Compare with results saved by --json.")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Fraction a metric may be worse than the baseline (default 0.2).")
+    args = parser.parse_args(argv)
+
+    results = {}
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        os.chdir(temp_dir)  # The stores and the GUI create their files here
+        store = open_log_store(args.store)
+        results.update(bench_ingest(args.ingest_lines))
+        results.update(bench_sync(args.sync_lines, store))
+        if not args.no_gui:
+            results.update(bench_gui(store, args.scans, args.duration))
+        store.close()
+        os.chdir(cwd)
+
+    for name, value in results.items():
+        print(f"{name:<22}{value:>14,.3f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
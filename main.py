@@ -1,16 +1,494 @@
 import sys
-import re
 import serial
 import serial.tools.list_ports
-import time
+from collections import deque
 
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QPushButton, QWidget, 
     QVBoxLayout, QHBoxLayout, QLabel, QStackedWidget, 
-    QTableWidget, QTableWidgetItem, QComboBox, QLineEdit, QTextEdit, QSplitter
+    QTableView, QHeaderView, QComboBox, QLineEdit, QPlainTextEdit, QSplitter,
+    QCheckBox, QDateTimeEdit, QFileDialog
 )
-from PyQt6.QtCore import Qt, QDateTime, QTimer
-import os
+from PyQt6.QtGui import QColor
+from PyQt6.QtCore import Qt, QDateTime, QObject, QTimer, pyqtSignal, QAbstractTableModel, QModelIndex
+import calendar
+import time
+
+from rfid import metrics
+from rfid.inventory import Inventory
+from rfid.logindex import LogIndex
+from rfid.parsing import LogBlock
+from rfid.registry import TagRegistry
+from rfid.storage import open_log_store
+from rfid.aioprotocol import AsyncReader, LoopThread
+from rfid.enrollment import BulkEnrollment, read_item_names
+from rfid.protocol import open_port, normalize_item_name, scanned_rfid, SCAN_NOW
+from rfid.sync import LogSync, SyncGroup
+
+LOG_STORE_BACKEND = "sqlite"  # "sqlite" (logs.db), "segments" (logs/, compressed history) or "text" (data.txt only)
+TAG_REGISTRY_PATH = "tags.dat"  # Enrolled tags and their items
+
+MONITOR_MAX_LINES = 2000  # Older lines are dropped from the serial monitor
+
+METRICS_PORT = None  # e.g. 9108 to serve /metrics (Prometheus) and /metrics.json on localhost
+METRICS_JSON_PATH = None  # e.g. "metrics.json" to rewrite the metrics to a file every few seconds
+METRICS_JSON_INTERVAL = 5000  # ms
+HEARTBEAT_INTERVAL = 100  # ms between event-loop lag measurements
+
+TABLE_UPDATE_SECONDS = metrics.histogram("table_update_seconds", "Time to load new logs into the tables")
+FILTER_SECONDS = metrics.histogram("filter_seconds", "Time to apply a logs filter")
+SERIAL_BATCH_SECONDS = metrics.histogram("gui_serial_batch_seconds", "Time to handle one batch of device messages")
+EVENT_LOOP_LAG = metrics.histogram("event_loop_lag_seconds", "How late a GUI timer fired")
+
+
+class ReaderManager(QObject):
+    """Several serial readers (one per gate) connected at the same time.
+
+    Each port is an AsyncReader: a LineReader thread reads it and commands
+    run as coroutines on one shared asyncio loop thread. Lines from all
+    readers are merged into one stream ordered by receive time and tagged
+    with the reader ID (the port name). Results come back as signals.
+    """
+
+    lines_received = pyqtSignal(list)  # [(received_at, reader_id, line)], oldest first
+    reader_lost = pyqtSignal(str, str)  # Reader ID, error
+    sync_progress = pyqtSignal(int, int)  # Lines, bytes received over all readers
+    sync_finished = pyqtSignal(bool, str)  # Success, error messages
+    time_synced = pyqtSignal(str, str)  # Reader ID, timestamp sent
+    enroll_finished = pyqtSignal(str, str, str, bool, str)  # Reader ID, RFID, item, success, error
+    bulk_scanned = pyqtSignal(str, bool)  # RFID, duplicate
+    bulk_enrolled = pyqtSignal(str, str, bool, str)  # RFID, item, success, error
+    bulk_finished = pyqtSignal(object)  # The BulkEnrollment session
+
+    # Emitted from the asyncio loop thread; delivered on the GUI thread
+    _lines_pending = pyqtSignal()
+    _reader_sync_progress = pyqtSignal(str, int, int)
+    _reader_sync_finished = pyqtSignal(str, bool, str)
+    _connection_lost = pyqtSignal(str, str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.loop_thread = LoopThread()
+        self.readers = {}  # Reader ID -> AsyncReader
+        self.incoming = deque()  # (received_at, reader_id, line) not yet handled by the GUI
+        self._notify_pending = False
+        self.sync_pending = set()  # Readers whose log sync has not finished yet
+        self.sync_errors = []
+        self.sync_counts = {}
+        self.bulk = None  # Running BulkEnrollment
+
+        self._lines_pending.connect(self.drain_readers)
+        self._reader_sync_progress.connect(self.handle_sync_progress)
+        self._reader_sync_finished.connect(self.handle_sync_finished)
+        self._connection_lost.connect(self.handle_connection_lost)
+
+    def reader_ids(self):
+        return list(self.readers)
+
+    def connect_reader(self, port):
+        """Open ``port`` and start reading it. Raises serial.SerialException."""
+        reader = AsyncReader(
+            open_port(port),
+            self.loop_thread.loop,
+            on_lines=lambda batch, reader_id=port: self.queue_lines(reader_id, batch),
+            on_sync_progress=lambda lines, size, reader_id=port: self._reader_sync_progress.emit(reader_id, lines, size),
+            on_sync_finished=lambda success, error, reader_id=port: self._reader_sync_finished.emit(reader_id, success, error),
+            on_connection_lost=lambda error, reader_id=port: self._connection_lost.emit(reader_id, error),
+        )
+        self.readers[port] = reader
+        reader.start()
+
+    def disconnect_reader(self, reader_id):
+        reader = self.readers.pop(reader_id, None)
+        if not reader:
+            return
+        reader.close()  # Aborts its part of a running sync
+        if reader_id in self.sync_pending:
+            self.handle_sync_finished(reader_id, False, "Disconnected")
+
+    def disconnect_all(self):
+        for reader_id in self.reader_ids():
+            self.disconnect_reader(reader_id)
+
+    def close(self):
+        self.disconnect_all()
+        self.loop_thread.stop()
+
+    def write(self, data, reader_id=None):
+        """Send ``data`` to one reader, or to all of them. Returns the IDs it was sent to."""
+        targets = [reader_id] if reader_id else self.reader_ids()
+        sent = []
+        for target in targets:
+            if target in self.readers:
+                self.readers[target].send(data)
+                sent.append(target)
+        return sent
+
+    def queue_lines(self, reader_id, batch):
+        """Called on the loop thread with each reader's new lines."""
+        self.incoming.extend((received_at, reader_id, line) for received_at, line in batch)
+        if not self._notify_pending:
+            self._notify_pending = True
+            self._lines_pending.emit()
+
+    def drain_readers(self):
+        """Hand every queued line to the GUI, merged in receive order."""
+        self._notify_pending = False
+        lines = []
+        while self.incoming:
+            lines.append(self.incoming.popleft())
+        lines.sort(key=lambda entry: entry[0])  # Stable, so each reader keeps its own order
+        if lines:
+            self.lines_received.emit(lines)
+
+    def handle_connection_lost(self, reader_id, error):
+        if reader_id in self.readers:
+            self.disconnect_reader(reader_id)
+            self.reader_lost.emit(reader_id, error)
+
+    def sync_time(self):
+        """SYNC_TIME on every reader at once. Returns the IDs it was sent to."""
+        for reader_id, reader in self.readers.items():
+            future = self.loop_thread.submit(reader.sync_time())
+            future.add_done_callback(lambda future, reader_id=reader_id: self._sync_time_done(reader_id, future))
+        return self.reader_ids()
+
+    def _sync_time_done(self, reader_id, future):
+        if not future.exception():
+            self.time_synced.emit(reader_id, future.result())
+
+    def enroll(self, reader_id, item_name, rfid):
+        """ENROLL on one reader; the result arrives through enroll_finished."""
+        future = self.loop_thread.submit(self.readers[reader_id].enroll(item_name, rfid))
+        future.add_done_callback(lambda future: self._enroll_done(reader_id, rfid, item_name, future))
+
+    def _enroll_done(self, reader_id, rfid, item_name, future):
+        error = future.exception()
+        if error:
+            self.enroll_finished.emit(reader_id, rfid, item_name, False, str(error) or type(error).__name__)
+        else:
+            self.enroll_finished.emit(reader_id, rfid, item_name, future.result(), "")
+
+    def start_bulk_enroll(self, reader_id, names=(), continuous=False, enrolled_item=None):
+        """Scan and enroll tags on one reader until done; see bulk_finished.
+
+        ``enrolled_item(rfid)`` is called on the loop thread and must not block.
+        """
+        self.bulk = BulkEnrollment(
+            self.readers[reader_id], names, continuous, enrolled_item=enrolled_item,
+            on_scanned=self.bulk_scanned.emit,
+            on_enrolled=lambda result: self.bulk_enrolled.emit(result.rfid, result.item, result.success, result.error),
+        )
+        future = self.loop_thread.submit(self.bulk.run())
+        future.add_done_callback(lambda future, bulk=self.bulk: self.bulk_finished.emit(bulk))
+
+    def add_bulk_name(self, name):
+        if self.bulk:
+            self.loop_thread.loop.call_soon_threadsafe(self.bulk.add_name, name)
+
+    def stop_bulk_enroll(self):
+        if self.bulk:
+            self.loop_thread.loop.call_soon_threadsafe(self.bulk.stop)
+
+    def start_log_sync(self, store):
+        """Send SYNC_LOGS to every reader; their logs replace their rows in ``store`` together."""
+        group = SyncGroup(store, len(self.readers))
+        self.sync_pending = set(self.readers)
+        self.sync_errors = []
+        self.sync_counts = {}
+        for reader_id, reader in self.readers.items():
+            reader.start_log_sync(LogSync(store, group, reader_id))
+
+    def cancel_log_sync(self):
+        for reader in self.readers.values():
+            reader.cancel_log_sync()
+
+    def handle_sync_progress(self, reader_id, lines, size):
+        self.sync_counts[reader_id] = (lines, size)
+        self.sync_progress.emit(
+            sum(count[0] for count in self.sync_counts.values()),
+            sum(count[1] for count in self.sync_counts.values()),
+        )
+
+    def handle_sync_finished(self, reader_id, success, error):
+        if reader_id not in self.sync_pending:
+            return
+        self.sync_pending.discard(reader_id)
+        if not success:
+            self.sync_errors.append(f"{reader_id}: {error}")
+        if not self.sync_pending:
+            self.sync_finished.emit(not self.sync_errors, "; ".join(self.sync_errors))
+
+
+class LogTableModel(QAbstractTableModel):
+    """Table model over a LogIndex, optionally showing only the rows of a filter.
+
+    QTableView only asks for the cells that are on screen, so no per-cell
+    objects are created, and rows hidden by the filter are never touched.
+    Matching rows from history that is not loaded can be passed to
+    ``set_filter``; they are shown before the loaded ones.
+    """
+
+    HEADERS = ["Timestamp", "RFID #", "Item", "Action"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.log_index = LogIndex()
+        self.filter_args = {}
+        self.visible_rows = None  # Row numbers shown while a filter is active
+        self.older_matches = LogBlock()  # Matching rows older than the loaded ones
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        if self.visible_rows is None:
+            return len(self.log_index)
+        return len(self.older_matches) + len(self.visible_rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and index.isValid():
+            row = index.row()
+            if self.visible_rows is None:
+                return self.log_index.row(row)[index.column()]
+            if row < len(self.older_matches):
+                return self.older_matches[row][index.column()]
+            return self.log_index.row(self.visible_rows[row - len(self.older_matches)])[index.column()]
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def append_rows(self, rows):
+        """Append (timestamp, rfid, item, action) rows without touching existing ones."""
+        if not rows:
+            return
+        if self.visible_rows is None:
+            first = len(self.log_index)
+            self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+            self.log_index.append_rows(rows)
+            self.endInsertRows()
+            return
+
+        # Only new rows that match the current filter become visible
+        first = self.log_index.append_rows(rows)
+        matching = self.log_index.filter_range(first, len(self.log_index), **self.filter_args)
+        if matching:
+            shown = len(self.older_matches) + len(self.visible_rows)
+            self.beginInsertRows(QModelIndex(), shown, shown + len(matching) - 1)
+            self.visible_rows.extend(matching)
+            self.endInsertRows()
+
+    def prepend_rows(self, rows):
+        """Put older rows before the loaded ones. Rebuilds the index."""
+        if not rows:
+            return
+        loaded = self.log_index
+        self.beginResetModel()
+        self.log_index = LogIndex()
+        self.log_index.append_rows(rows)
+        self.log_index.append_rows(loaded.block)
+        if self.visible_rows is not None:
+            self.visible_rows = self.log_index.filter(**self.filter_args)
+            # Older matches that are loaded now are found in the index
+            since = min(self.log_index.times)
+            older = self.older_matches
+            self.older_matches = older.take([row for row, ts in enumerate(older.times) if ts < since])
+        self.endResetModel()
+
+    def set_filter(self, older_matches=None, **filter_args):
+        """Show only the rows matching ``LogIndex.filter(**filter_args)``.
+
+        ``older_matches`` is a LogBlock of matching rows from history that is
+        not loaded, such as ``LogStore.query_older`` returns.
+        """
+        self.beginResetModel()
+        self.filter_args = filter_args
+        self.visible_rows = self.log_index.filter(**filter_args)
+        self.older_matches = LogBlock() if older_matches is None or self.visible_rows is None else older_matches
+        self.endResetModel()
+
+    def clear(self):
+        self.beginResetModel()
+        self.log_index.clear()
+        if self.visible_rows is not None:
+            self.visible_rows = []
+        self.older_matches = LogBlock()
+        self.endResetModel()
+
+
+class InventoryTableModel(QAbstractTableModel):
+    """One row per RFID tag with its current in/out status."""
+
+    HEADERS = ["RFID #", "Item", "Status", "Last Seen"]
+
+    def __init__(self, inventory, parent=None):
+        super().__init__(parent)
+        self.inventory = inventory
+        self.only_checked_out = False
+        self.rfids = []  # Row order
+        self.positions = {}  # RFID -> row
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rfids)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        state = self.inventory.tags[self.rfids[index.row()]]
+        if role == Qt.ItemDataRole.DisplayRole:
+            if index.column() == 0:
+                return state.rfid
+            if index.column() == 1:
+                return state.item
+            if index.column() == 2:
+                return "❌ OUT" if state.checked_out else "✅ IN"
+            return state.last_seen
+        if role == Qt.ItemDataRole.ForegroundRole and index.column() == 2:
+            return QColor("red") if state.checked_out else QColor("green")
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def set_only_checked_out(self, only_checked_out):
+        self.only_checked_out = only_checked_out
+        self.reset()
+
+    def reset(self):
+        self.beginResetModel()
+        self.rfids = [
+            rfid for rfid, state in self.inventory.tags.items()
+            if state.checked_out or not self.only_checked_out
+        ]
+        self.positions = {rfid: row for row, rfid in enumerate(self.rfids)}
+        self.endResetModel()
+
+    def update(self, changed):
+        """Refresh the rows of the changed RFIDs and add rows for new ones."""
+        if self.only_checked_out:
+            self.reset()  # Rows come and go with every Entry/Exit
+            return
+
+        new = [rfid for rfid in changed if rfid not in self.positions]
+        for rfid in changed:
+            row = self.positions.get(rfid)
+            if row is not None:
+                self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.HEADERS) - 1))
+        if new:
+            first = len(self.rfids)
+            self.beginInsertRows(QModelIndex(), first, first + len(new) - 1)
+            for rfid in new:
+                self.positions[rfid] = len(self.rfids)
+                self.rfids.append(rfid)
+            self.endInsertRows()
+
+
+class MetricsTableModel(QAbstractTableModel):
+    """Read-only table of a metrics registry snapshot."""
+
+    HEADERS = ["Metric", "Count", "Rate/s", "p50", "p99", "Max"]
+
+    def __init__(self, registry=metrics.REGISTRY, parent=None):
+        super().__init__(parent)
+        self.registry = registry
+        self.rows = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and index.isValid():
+            return self.rows[index.row()][index.column()]
+        if role == Qt.ItemDataRole.ToolTipRole and index.isValid():
+            return self.registry.metrics[self.rows[index.row()][0]].help
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def refresh(self):
+        rows = []
+        for name, values in self.registry.snapshot().items():
+            if values["type"] == "histogram":
+                rows.append([
+                    name, f"{values['count']:,}", "",
+                    *(self.format_seconds(values[key] if values["count"] else None) for key in ("p50", "p99", "max")),
+                ])
+            elif values["type"] == "counter":
+                rows.append([name, f"{values['value']:,}", f"{values['rate']:,.1f}", "", "", ""])
+            else:
+                rows.append([name, f"{values['value']:,}", "", "", "", ""])
+        self.beginResetModel()
+        self.rows = rows
+        self.endResetModel()
+
+    @staticmethod
+    def format_seconds(seconds):
+        if seconds is None:
+            return ""
+        return f"{seconds * 1000:,.1f} ms" if seconds < 1 else f"{seconds:,.2f} s"
+
+
+class SerialMonitor(QPlainTextEdit):
+    """Read-only log view that keeps only the last ``max_lines`` lines.
+
+    ``append`` only queues the text; queued lines are added in one go on the
+    next frame, so a burst of device messages costs one repaint. While paused
+    the view stays still and new lines wait (up to ``max_lines``) until it is
+    resumed.
+    """
+
+    FLUSH_INTERVAL = 16  # ms, about one frame
+
+    def __init__(self, max_lines=MONITOR_MAX_LINES, parent=None):
+        super().__init__(parent)
+        self.setReadOnly(True)
+        self.setMaximumBlockCount(max_lines)
+        self.pending = deque(maxlen=max_lines)
+        self.paused = False
+
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.setInterval(self.FLUSH_INTERVAL)
+        self.flush_timer.timeout.connect(self.flush)
+
+    def append(self, text):
+        self.pending.append(text)
+        if not self.paused and not self.flush_timer.isActive():
+            self.flush_timer.start()
+
+    def flush(self):
+        if self.paused or not self.pending:
+            return
+        text = "\n".join(self.pending)
+        self.pending.clear()
+        self.appendPlainText(text)
+        self.verticalScrollBar().setValue(self.verticalScrollBar().maximum())
+
+    def set_paused(self, paused):
+        self.paused = paused
+        if not paused:
+            self.flush()
+
+    def clear(self):
+        self.pending.clear()
+        super().clear()
+
 
 class RFIDApp(QMainWindow):
     def __init__(self):
@@ -19,9 +497,27 @@ class RFIDApp(QMainWindow):
         self.setGeometry(100, 100, 800, 600)
         self.setFixedSize(800, 600)  # Fix the window size to 800x600
 
-        # Initialize Serial Connection
-        self.serial_port = None
+        # Initialize Serial Connections (one reader per gate)
+        self.readers = ReaderManager(self)
+        self.readers.lines_received.connect(self.handle_serial_lines)
+        self.readers.reader_lost.connect(self.handle_serial_disconnect)
+        self.readers.sync_progress.connect(self.update_sync_progress)
+        self.readers.sync_finished.connect(self.handle_sync_finished)
+        self.readers.time_synced.connect(self.handle_time_synced)
+        self.readers.enroll_finished.connect(self.handle_enroll_finished)
+        self.readers.bulk_scanned.connect(self.handle_bulk_scanned)
+        self.readers.bulk_enrolled.connect(self.handle_bulk_enrolled)
+        self.readers.bulk_finished.connect(self.handle_bulk_finished)
         self.current_rfid = None 
+        self.current_reader = None  # Reader that scanned current_rfid
+        self.syncing_logs = False
+        self.bulk_names = []  # Item names loaded for bulk enrollment
+        self.bulk_counts = {}
+        self.metrics_server = metrics.serve_metrics(METRICS_PORT) if METRICS_PORT else None
+        # Imports an existing data.txt into logs.db the first time
+        self.log_store = open_log_store(LOG_STORE_BACKEND)
+        # Scanned tags are looked up here, so enrolled ones are recognized without asking the device
+        self.tag_registry = TagRegistry(TAG_REGISTRY_PATH)
         # Main widget
         main_widget = QWidget()
         main_layout = QVBoxLayout()
@@ -37,10 +533,18 @@ class RFIDApp(QMainWindow):
         self.view_logs_button.setStyleSheet("padding: 5px; font-size: 14px; font-weight: bold;")
         self.view_logs_button.clicked.connect(self.show_logs)
         
+        self.inventory_button = QPushButton("Inventory")
+        self.inventory_button.setStyleSheet("padding: 5px; font-size: 14px; font-weight: bold;")
+        self.inventory_button.clicked.connect(self.show_inventory)
+
         self.enroll_rfid_button = QPushButton("Enroll RFID")
         self.enroll_rfid_button.setStyleSheet("padding: 5px; font-size: 14px; font-weight: bold;")
         self.enroll_rfid_button.clicked.connect(self.show_enroll)
 
+        self.diagnostics_button = QPushButton("Diagnostics")
+        self.diagnostics_button.setStyleSheet("padding: 5px; font-size: 14px; font-weight: bold;")
+        self.diagnostics_button.clicked.connect(self.show_diagnostics)
+
         # Sync Time Button (Initially Disabled)
         self.sync_time_button = QPushButton("Sync Time")
         self.sync_time_button.setStyleSheet("padding: 5px; font-size: 14px; font-weight: bold; background-color: gray;")
@@ -54,9 +558,17 @@ class RFIDApp(QMainWindow):
         self.sync_logs_button.clicked.connect(self.sync_logs)
         
         sidebar.addWidget(self.view_logs_button)
+        sidebar.addWidget(self.inventory_button)
         sidebar.addWidget(self.enroll_rfid_button)
+        sidebar.addWidget(self.diagnostics_button)
         sidebar.addWidget(self.sync_time_button)
         sidebar.addWidget(self.sync_logs_button)
+
+        # Sync progress (only visible while logs are being received)
+        self.sync_status_label = QLabel("")
+        self.sync_status_label.setStyleSheet("font-size: 12px;")
+        self.sync_status_label.setVisible(False)
+        sidebar.addWidget(self.sync_status_label)
         sidebar.addStretch()
 
         # Serial Port Selection
@@ -75,11 +587,17 @@ class RFIDApp(QMainWindow):
         self.connect_serial_button = QPushButton("Connect")
         self.connect_serial_button.setStyleSheet("padding: 5px; font-size: 14px;")
         self.connect_serial_button.clicked.connect(self.connect_serial)
+        self.serial_combo.currentTextChanged.connect(self.update_connect_button)
+
+        self.connected_readers_label = QLabel("Connected: none")
+        self.connected_readers_label.setStyleSheet("font-size: 12px;")
+        self.connected_readers_label.setWordWrap(True)
 
         sidebar.addWidget(self.serial_label)
         sidebar.addWidget(self.serial_combo)
         sidebar.addWidget(self.refresh_serial_button)
         sidebar.addWidget(self.connect_serial_button)
+        sidebar.addWidget(self.connected_readers_label)
 
         # Stack to switch between pages
         self.stack = QStackedWidget()
@@ -113,25 +631,64 @@ class RFIDApp(QMainWindow):
         enroll_layout.addWidget(self.rfid_label)
         enroll_layout.addWidget(self.item_name_input)
         enroll_layout.addWidget(self.save_button)
+
+        # Bulk enrollment: scan tags one after the other and pair them with names
+        bulk_title = QLabel("📦 Bulk Enrollment")
+        bulk_title.setStyleSheet("font-size: 16px; font-weight: bold;")
+
+        self.bulk_load_button = QPushButton("📂 Load Names...")
+        self.bulk_load_button.setStyleSheet("padding: 5px; font-size: 14px;")
+        self.bulk_load_button.clicked.connect(self.load_bulk_names)
+
+        self.bulk_continuous_checkbox = QCheckBox("Continuous (type names while scanning)")
+        self.bulk_continuous_checkbox.toggled.connect(self.update_bulk_ui)
+
+        self.bulk_start_button = QPushButton("▶ Start Bulk Enrollment")
+        self.bulk_start_button.setStyleSheet("padding: 5px; font-size: 14px; font-weight: bold;")
+        self.bulk_start_button.clicked.connect(self.toggle_bulk_enroll)
+
+        bulk_buttons = QHBoxLayout()
+        bulk_buttons.addWidget(self.bulk_load_button)
+        bulk_buttons.addWidget(self.bulk_continuous_checkbox)
+        bulk_buttons.addWidget(self.bulk_start_button)
+
+        self.bulk_name_input = QLineEdit()
+        self.bulk_name_input.setPlaceholderText("Name for the next scanned tag, then press Enter...")
+        self.bulk_name_input.setStyleSheet("padding: 5px; font-size: 14px;")
+        self.bulk_name_input.returnPressed.connect(self.add_bulk_name)
+
+        self.bulk_status_label = QLabel("No names loaded")
+        self.bulk_status_label.setStyleSheet("font-size: 14px;")
+        self.bulk_status_label.setWordWrap(True)
+
+        enroll_layout.addWidget(bulk_title)
+        enroll_layout.addLayout(bulk_buttons)
+        enroll_layout.addWidget(self.bulk_name_input)
+        enroll_layout.addWidget(self.bulk_status_label)
         enroll_layout.addStretch()
         
         self.enroll_page.setLayout(enroll_layout)
+        self.update_bulk_ui()
 
         # Logs Page
         self.logs_page = QWidget()
         logs_layout = QVBoxLayout()
         
-        self.logs_table = QTableWidget()
-        self.logs_table.setColumnCount(4)
-        self.logs_table.setHorizontalHeaderLabels(["Timestamp", "RFID #", "Item", "Action"])
+        self.logs_model = LogTableModel(self)
+        self.logs_table = QTableView()
+        self.logs_table.setModel(self.logs_model)
         self.logs_table.setStyleSheet("font-size: 14px;")
         self.logs_table.horizontalHeader().setStyleSheet("font-size: 14px; font-weight: bold;")
-        self.logs_table.resizeColumnsToContents()  # Auto-fit content
+        # Fixed row heights so the view never measures rows that are off screen
+        self.logs_table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.logs_table.verticalHeader().setDefaultSectionSize(24)
 
         self.logs_table.setColumnWidth(0, 140)  # Column 1 width
         self.logs_table.setColumnWidth(1, 200)  # Column 2 width
         self.logs_table.setColumnWidth(2, 200)  # Column 3 width
         self.logs_table.setColumnWidth(3, 50)  # Column 4 width
+        # Scrolling back to the top loads older logs
+        self.logs_table.verticalScrollBar().actionTriggered.connect(self.handle_logs_scrolled)
 
         # Create title label
         logs_title = QLabel("LOGS")
@@ -148,40 +705,166 @@ class RFIDApp(QMainWindow):
         refresh_button.clicked.connect(self.populate_logs)
         clear_button.clicked.connect(self.clear_logs)
 
+        # Only shown while older logs are stored but not loaded
+        self.load_older_button = QPushButton("⏪ Load Older")
+        self.load_older_button.setStyleSheet("font-size: 14px; font-weight: bold;")
+        self.load_older_button.clicked.connect(lambda: self.load_older_logs())  # Not clicked's checked argument as start
+
         # Create horizontal layout for buttons
         buttons_layout = QHBoxLayout()
         buttons_layout.addWidget(refresh_button)
+        buttons_layout.addWidget(self.load_older_button)
         buttons_layout.addWidget(clear_button)
 
+        # Filter controls
+        self.logs_search_input = QLineEdit()
+        self.logs_search_input.setPlaceholderText("🔎 Search RFID or item...")
+        self.logs_search_input.setStyleSheet("padding: 3px; font-size: 14px;")
+        self.logs_action_combo = QComboBox()
+        self.logs_action_combo.addItems(["All", "Entry", "Exit"])
+        self.logs_time_checkbox = QCheckBox("From")
+        self.logs_from_edit = QDateTimeEdit(QDateTime.currentDateTime().addDays(-1))
+        self.logs_to_edit = QDateTimeEdit(QDateTime.currentDateTime())
+        for edit in (self.logs_from_edit, self.logs_to_edit):
+            edit.setDisplayFormat("yyyy-MM-dd HH:mm")
+            edit.setCalendarPopup(True)
+            edit.setEnabled(False)  # Enabled with the "From" checkbox
+
+        # Filter again shortly after the user stops typing, not on every key
+        self.logs_filter_timer = QTimer(self)
+        self.logs_filter_timer.setSingleShot(True)
+        self.logs_filter_timer.setInterval(200)
+        self.logs_filter_timer.timeout.connect(self.apply_logs_filter)
+        self.logs_search_input.textChanged.connect(self.logs_filter_timer.start)
+        self.logs_action_combo.currentIndexChanged.connect(self.apply_logs_filter)
+        self.logs_time_checkbox.toggled.connect(self.logs_from_edit.setEnabled)
+        self.logs_time_checkbox.toggled.connect(self.logs_to_edit.setEnabled)
+        self.logs_time_checkbox.toggled.connect(self.apply_logs_filter)
+        self.logs_from_edit.dateTimeChanged.connect(self.logs_filter_timer.start)
+        self.logs_to_edit.dateTimeChanged.connect(self.logs_filter_timer.start)
+
+        filter_layout = QHBoxLayout()
+        filter_layout.addWidget(self.logs_search_input, 1)
+        filter_layout.addWidget(self.logs_action_combo)
+        filter_layout.addWidget(self.logs_time_checkbox)
+        filter_layout.addWidget(self.logs_from_edit)
+        filter_layout.addWidget(QLabel("To"))
+        filter_layout.addWidget(self.logs_to_edit)
+
         # Add widgets to main logs layout
         logs_layout.addWidget(logs_title)
         logs_layout.addLayout(buttons_layout)  # Add buttons layout
+        logs_layout.addLayout(filter_layout)
         logs_layout.addWidget(self.logs_table)
         
         self.logs_page.setLayout(logs_layout)
 
+        # Inventory Page (current in/out status of every tag, kept up to date from the logs)
+        self.inventory = Inventory()
+        self.inventory_page = QWidget()
+        inventory_layout = QVBoxLayout()
+
+        inventory_title = QLabel("INVENTORY")
+        inventory_title.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        inventory_title.setStyleSheet("font-size: 14px; font-weight: bold;")
+
+        self.inventory_summary_label = QLabel("")
+        self.inventory_summary_label.setStyleSheet("font-size: 14px;")
+        self.only_checked_out_checkbox = QCheckBox("Show only checked out")
+        self.only_checked_out_checkbox.setStyleSheet("font-size: 14px;")
+
+        self.inventory_model = InventoryTableModel(self.inventory, self)
+        self.only_checked_out_checkbox.toggled.connect(self.inventory_model.set_only_checked_out)
+        self.inventory_table = QTableView()
+        self.inventory_table.setModel(self.inventory_model)
+        self.inventory_table.setStyleSheet("font-size: 14px;")
+        self.inventory_table.horizontalHeader().setStyleSheet("font-size: 14px; font-weight: bold;")
+        self.inventory_table.setColumnWidth(0, 180)
+        self.inventory_table.setColumnWidth(1, 150)
+        self.inventory_table.setColumnWidth(2, 70)
+        self.inventory_table.setColumnWidth(3, 140)
+
+        inventory_options = QHBoxLayout()
+        inventory_options.addWidget(self.inventory_summary_label, 1)
+        inventory_options.addWidget(self.only_checked_out_checkbox)
+
+        inventory_layout.addWidget(inventory_title)
+        inventory_layout.addLayout(inventory_options)
+        inventory_layout.addWidget(self.inventory_table)
+        self.inventory_page.setLayout(inventory_layout)
+
+        # Diagnostics Page (counters and latencies of the serial pipeline, refreshed every second)
+        self.diagnostics_page = QWidget()
+        diagnostics_layout = QVBoxLayout()
+
+        diagnostics_title = QLabel("DIAGNOSTICS")
+        diagnostics_title.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        diagnostics_title.setStyleSheet("font-size: 14px; font-weight: bold;")
+
+        self.metrics_model = MetricsTableModel(parent=self)
+        self.metrics_table = QTableView()
+        self.metrics_table.setModel(self.metrics_model)
+        self.metrics_table.setStyleSheet("font-size: 12px;")
+        self.metrics_table.horizontalHeader().setStyleSheet("font-size: 12px; font-weight: bold;")
+        self.metrics_table.verticalHeader().setVisible(False)
+        self.metrics_table.setColumnWidth(0, 200)
+        for column in range(1, len(MetricsTableModel.HEADERS)):
+            self.metrics_table.setColumnWidth(column, 70)
+
+        diagnostics_layout.addWidget(diagnostics_title)
+        diagnostics_layout.addWidget(self.metrics_table)
+        self.diagnostics_page.setLayout(diagnostics_layout)
+
+        self.diagnostics_timer = QTimer(self)
+        self.diagnostics_timer.setInterval(1000)
+        self.diagnostics_timer.timeout.connect(self.metrics_model.refresh)
+
+        # Measures how late the event loop runs a timer, i.e. how long the window was busy
+        self.heartbeat_due = time.monotonic() + HEARTBEAT_INTERVAL / 1000
+        self.heartbeat_timer = QTimer(self)
+        self.heartbeat_timer.setInterval(HEARTBEAT_INTERVAL)
+        self.heartbeat_timer.timeout.connect(self.heartbeat)
+        self.heartbeat_timer.start()
+
+        if METRICS_JSON_PATH:
+            self.metrics_json_timer = QTimer(self)
+            self.metrics_json_timer.setInterval(METRICS_JSON_INTERVAL)
+            self.metrics_json_timer.timeout.connect(self.write_metrics_json)
+            self.metrics_json_timer.start()
+
         # Add pages to stack
         self.stack.addWidget(self.logs_page)
+        self.stack.addWidget(self.inventory_page)
         self.stack.addWidget(self.enroll_page)
+        self.stack.addWidget(self.diagnostics_page)
+        self.stack.currentChanged.connect(self.update_diagnostics_timer)
 
         # Add widgets to top section
         top_section.addLayout(sidebar)
         top_section.addWidget(self.stack, 1)
 
         # Serial Monitor (Bottom Section)
-        self.serial_monitor = QTextEdit()
-        self.serial_monitor.setReadOnly(True)
+        self.serial_monitor = SerialMonitor()
         self.serial_monitor.setStyleSheet("background: black; color: lime; font-family: monospace; font-size: 14px; padding: 5px;")
         self.serial_monitor.setFixedHeight(200)
         
         self.clear_serial_button = QPushButton("🧹 Clear Monitor")
         self.clear_serial_button.setStyleSheet("padding: 10px; font-size: 14px;")
         self.clear_serial_button.clicked.connect(self.serial_monitor.clear)
+
+        self.pause_serial_button = QPushButton("⏸ Pause Monitor")
+        self.pause_serial_button.setStyleSheet("padding: 10px; font-size: 14px;")
+        self.pause_serial_button.setCheckable(True)
+        self.pause_serial_button.toggled.connect(self.toggle_monitor_pause)
+
+        monitor_buttons = QHBoxLayout()
+        monitor_buttons.addWidget(self.clear_serial_button)
+        monitor_buttons.addWidget(self.pause_serial_button)
         
         serial_layout = QVBoxLayout()
         serial_layout.addWidget(QLabel("📡 Serial Monitor"))
         serial_layout.addWidget(self.serial_monitor)
-        serial_layout.addWidget(self.clear_serial_button)
+        serial_layout.addLayout(monitor_buttons)
         
         # Add sections to main layout
         main_layout.addLayout(top_section)
@@ -193,88 +876,146 @@ class RFIDApp(QMainWindow):
         # Default to Logs Page
         self.show_logs()
         self.populate_logs()
-
-        # Timer for checking serial connection
-        self.serial_check_timer = QTimer(self)
-        self.serial_check_timer.timeout.connect(self.check_serial_connection)
-        self.serial_check_timer.start(1)  # Check connection every 500ms (reduced from 1000ms)
-
-        # Timer for reading serial data
-        self.serial_timer = QTimer(self)
-        self.serial_timer.timeout.connect(self.read_serial)
-        self.serial_timer.start(1)  # Read serial data every 100ms (reduced from 500ms)
     
+    def toggle_monitor_pause(self, paused):
+        self.serial_monitor.set_paused(paused)
+        self.pause_serial_button.setText("▶ Resume Monitor" if paused else "⏸ Pause Monitor")
+
     def show_enroll(self):
         self.stack.setCurrentWidget(self.enroll_page)
 
-    def sync_logs(self):
-        if self.serial_port and self.serial_port.is_open:
-            try:
-                self.serial_port.write("SYNC_LOGS\n".encode())
-                self.serial_monitor.append("📤 Sent: SYNC_LOGS")
+    def show_diagnostics(self):
+        self.stack.setCurrentWidget(self.diagnostics_page)
+
+    def update_diagnostics_timer(self):
+        # Only refresh the metrics table while it is visible
+        if self.stack.currentWidget() is self.diagnostics_page:
+            self.metrics_model.refresh()
+            self.diagnostics_timer.start()
+        else:
+            self.diagnostics_timer.stop()
 
-                receiving_logs = False  # Flag to check if we are inside log transfer
-                log_file_path = "data.txt"
+    def heartbeat(self):
+        now = time.monotonic()
+        EVENT_LOOP_LAG.observe(max(0.0, now - self.heartbeat_due))
+        self.heartbeat_due = now + HEARTBEAT_INTERVAL / 1000
 
-                with open(log_file_path, "w", encoding="utf-8") as log_file:  # Overwrite logs
-                    while True:
-                        if self.serial_port.in_waiting > 0:
-                            line = self.serial_port.readline().decode().strip()
+    def write_metrics_json(self):
+        try:
+            metrics.REGISTRY.write_json(METRICS_JSON_PATH)
+        except OSError as e:
+            self.serial_monitor.append(f"❌ Could not write metrics: {e}")
+            self.metrics_json_timer.stop()
 
-                            if line == "START_LOGS":
-                                receiving_logs = True  # Start receiving logs
-                                self.serial_monitor.append("📥 Received: START_LOGS")
+    def sync_logs(self):
+        # Clicking again while a sync is running cancels it
+        if self.syncing_logs:
+            self.readers.cancel_log_sync()
+            return
 
-                            elif line == "END_LOGS":
-                                self.serial_monitor.append("📥 Received: END_LOGS")
-                                break  # Stop reading logs
+        if self.readers.reader_ids():
+            # Logs are received on the reader threads and replace the stored logs once all are complete
+            self.readers.start_log_sync(self.log_store)
+            self.serial_monitor.append("📤 Sent: SYNC_LOGS")
+            self.syncing_logs = True
+            self.sync_logs_button.setText("Cancel Sync")
+            self.sync_status_label.setText("⏳ Waiting for device...")
+            self.sync_status_label.setVisible(True)
 
-                            elif receiving_logs:
-                                self.serial_monitor.append(f"📥 Received: {line}")
-                                log_file.write(line + "\n")  # Save to file
+    def update_sync_progress(self, lines, size):
+        self.sync_status_label.setText(f"⏳ {lines:,} logs ({size / 1024:,.0f} KB)")
 
-                self.serial_monitor.append("✅ Log sync complete!")
+    def handle_sync_finished(self, success, error):
+        self.reset_sync_ui()
+        if success:
+            self.serial_monitor.append("✅ Log sync complete!")
+            self.populate_logs()
+        else:
+            self.serial_monitor.append(f"❌ Error during log sync: {error}")
 
-            except Exception as e:
-                self.serial_monitor.append(f"❌ Error during log sync: {str(e)}")
-                # Restore backup if it exists
-                if os.path.exists(log_file_path):
-                    os.rename(log_file_path, "data.txt")
-                    self.serial_monitor.append("✅ Restored previous log file")
+    def reset_sync_ui(self):
+        self.syncing_logs = False
+        self.sync_logs_button.setText("Sync Logs")
+        self.sync_status_label.setVisible(False)
 
 
     def show_logs(self):
         self.stack.setCurrentWidget(self.logs_page)
 
+    def show_inventory(self):
+        self.stack.setCurrentWidget(self.inventory_page)
+
     def populate_logs(self):
-        """Load logs from data.txt and display them in the table."""
-        self.logs_table.setRowCount(0)  # Clear table before adding new data
+        """Load new logs from the log store into the table.
 
-        log_file_path = "data.txt"
-        try:
-            with open(log_file_path, "r", encoding="utf-8") as log_file:
-                logs = log_file.readlines()
-
-            for log in logs:
-                log = log.strip()
-                if not log:
-                    continue  # Skip empty lines
-
-                # Example log format: "2025-03-26 12:00:00, 1234567893, Multimeter, Exit"
-                log_parts = [part.strip() for part in log.split(",")]
-                if len(log_parts) == 4:
-                    timestamp, rfid, item, action = log_parts
-                    row_position = self.logs_table.rowCount()
-                    self.logs_table.insertRow(row_position)
-
-                    # Add data to table
-                    self.logs_table.setItem(row_position, 0, QTableWidgetItem(timestamp))
-                    self.logs_table.setItem(row_position, 1, QTableWidgetItem(rfid))
-                    self.logs_table.setItem(row_position, 2, QTableWidgetItem(item))
-                    self.logs_table.setItem(row_position, 3, QTableWidgetItem(action.strip()))
-
-        except FileNotFoundError:
-            self.serial_monitor.append("⚠️ No logs found (data.txt missing).")
+        Only rows added since the last call are fetched; the table is rebuilt
+        only if the stored logs were replaced or cleared.
+        """
+        with TABLE_UPDATE_SECONDS.time():
+            self._populate_logs()
+
+    def _populate_logs(self):
+        reloaded, rows = self.log_store.read_new()
+        if reloaded:
+            self.logs_model.clear()  # Clear table before adding new data
+            self.inventory.clear()
+            # Tags whose last event is in history that is not loaded yet
+            latest = self.log_store.latest_rows()
+            self.inventory.apply_rows(latest)
+            self.tag_registry.learn_rows(latest)
+        self.logs_model.append_rows(rows)
+        self.tag_registry.learn_rows(rows)
+
+        changed = self.inventory.apply_rows(rows)
+        if reloaded:
+            self.inventory_model.reset()
+        else:
+            self.inventory_model.update(changed)
+        self.update_inventory_summary()
+        if reloaded and self.logs_model.filter_args.get("text"):
+            self.apply_logs_filter()  # Search the history that is not loaded again
+        self.load_older_button.setVisible(self.log_store.has_older())
+
+    def load_older_logs(self, start=None):
+        """Load stored logs older than the table shows (one segment, or back to ``start``)."""
+        if not self.log_store.has_older():
+            return
+        with TABLE_UPDATE_SECONDS.time():
+            rows = self.log_store.read_older(start)
+            self.logs_model.prepend_rows(rows)
+        if rows and start is None:
+            # Keep the rows that were on screen in view
+            self.logs_table.scrollTo(self.logs_model.index(len(rows), 0), QTableView.ScrollHint.PositionAtTop)
+        self.load_older_button.setVisible(self.log_store.has_older())
+
+    def handle_logs_scrolled(self, action):
+        # Only user scrolling triggers actions, not the resets when rows are loaded
+        scroll_bar = self.logs_table.verticalScrollBar()
+        if scroll_bar.sliderPosition() == scroll_bar.minimum() and self.logs_model.visible_rows is None:
+            self.load_older_logs()
+
+    def update_inventory_summary(self):
+        checked_out = len(self.inventory.checked_out())
+        self.inventory_summary_label.setText(f"{checked_out} of {len(self.inventory.tags)} tools checked out")
+
+    def apply_logs_filter(self):
+        """Show only the logs matching the search box, action and time range."""
+        action = self.logs_action_combo.currentText()
+        filter_args = {
+            "text": self.logs_search_input.text().strip(),
+            "action": None if action == "All" else action,
+        }
+        if self.logs_time_checkbox.isChecked():
+            # Device timestamps have no time zone and are indexed as UTC
+            filter_args["start"] = calendar.timegm(self.logs_from_edit.dateTime().toPyDateTime().timetuple())
+            filter_args["end"] = calendar.timegm(self.logs_to_edit.dateTime().toPyDateTime().timetuple()) + 59
+            self.load_older_logs(filter_args["start"])  # No-op if that range is loaded already
+        with FILTER_SECONDS.time():
+            older_matches = None
+            if filter_args["text"] and self.log_store.has_older():
+                # Search the history that is not loaded too, e.g. a tool's last Exit months ago
+                older_matches = self.log_store.query_older(**filter_args)
+            self.logs_model.set_filter(older_matches, **filter_args)
 
     def populate_serial_ports(self):
         """Fetch and list available serial ports."""
@@ -284,111 +1025,209 @@ class RFIDApp(QMainWindow):
             self.serial_combo.addItem(port.device)
 
     def connect_serial(self):
+        """Connect the selected port, or disconnect it if it is already connected."""
         port = self.serial_combo.currentText()
 
-        # If a serial connection exists, close it first
-        if self.serial_port:
-            if self.serial_port.is_open:
-                self.serial_port.close()
-            self.serial_port = None
+        if port in self.readers.reader_ids():
+            self.readers.disconnect_reader(port)
             self.serial_monitor.append(f"🔴 Disconnected from {port}")
-            self.connect_serial_button.setText("Connect")
-            self.sync_time_button.setEnabled(False)
-            self.sync_time_button.setStyleSheet("padding: 5px; font-size: 14px; font-weight: bold; background-color: gray;")
-            self.sync_logs_button.setEnabled(False)
-            self.sync_logs_button.setStyleSheet("padding: 5px; font-size: 14px; font-weight: bold; background-color: gray;")
+            self.update_connection_state()
             return  # Exit function after disconnecting
 
         # Try to establish a new connection if a valid port is selected
-        if port != "No Ports Found":
+        if port and port != "No Ports Found":
             try:
-                self.serial_port = serial.Serial(port, 9600, timeout=1)
+                self.readers.connect_reader(port)
                 self.serial_monitor.append(f"✅ Connected to {port}")
-                self.connect_serial_button.setText("Disconnect")
-                self.sync_time_button.setEnabled(True)
-                self.sync_time_button.setStyleSheet("padding: 5px; font-size: 14px; font-weight: bold; background-color: green;")
-                self.sync_logs_button.setEnabled(True)
-                self.sync_logs_button.setStyleSheet("padding: 5px; font-size: 14px; font-weight: bold; background-color: green;")
             except serial.SerialException as e:
                 self.serial_monitor.append(f"❌ Connection Failed: {str(e)}")
-                self.serial_port = None
+            self.update_connection_state()
 
-    def check_serial_connection(self):
-        """Checks if the serial device is still connected."""
-        if self.serial_port:
-            try:
-                self.serial_port.in_waiting  # Try accessing the serial buffer
-            except serial.SerialException:
-                self.serial_monitor.append("⚠️ Device Disconnected!")
-                self.connect_serial_button.setText("Connect")
-                self.sync_time_button.setStyleSheet("padding: 5px; font-size: 14px; font-weight: bold; background-color: gray;")
-                self.sync_time_button.setEnabled(False)
-                self.disconnect_serial()
+    def update_connect_button(self):
+        connected = self.serial_combo.currentText() in self.readers.reader_ids()
+        self.connect_serial_button.setText("Disconnect" if connected else "Connect")
+
+    def update_connection_state(self):
+        """Refresh the buttons after a reader was connected or disconnected."""
+        reader_ids = self.readers.reader_ids()
+        self.update_connect_button()
+        self.connected_readers_label.setText("Connected: " + (", ".join(reader_ids) or "none"))
+
+        color = "green" if reader_ids else "gray"
+        for button in (self.sync_time_button, self.sync_logs_button):
+            button.setEnabled(bool(reader_ids))
+            button.setStyleSheet(f"padding: 5px; font-size: 14px; font-weight: bold; background-color: {color};")
+        if not reader_ids:
+            self.reset_sync_ui()
+        if self.current_reader not in reader_ids:
+            self.current_reader = None
+
+    def handle_serial_disconnect(self, reader_id, error):
+        """Called when a reader's serial device goes away."""
+        self.serial_monitor.append(f"⚠️ Device Disconnected! {reader_id} ({error})")
+        self.update_connection_state()
 
     def sync_time(self):
-        if self.serial_port and self.serial_port.is_open:
-            self.serial_port.write("SYNC_TIME\n".encode())
-            time.sleep(1)  # 1 second delay
-            current_time = QDateTime.currentDateTime().toString("yyyy-MM-dd HH:mm:ss")
-            message = f"{current_time}\n"
-            self.serial_port.write(message.encode())
-            self.serial_monitor.append(f"📤 Sent: SYNC_TIME\n{current_time}")
-
-    def read_serial(self):
-        if self.serial_port and self.serial_port.is_open:
-            try:
-                if self.serial_port.in_waiting:
-                    data = self.serial_port.readline().decode().strip()
-                    if data:
-                        self.serial_monitor.append(f"📥 Received: {data}")
-                        self.serial_monitor.verticalScrollBar().setValue(self.serial_monitor.verticalScrollBar().maximum())
-
-                        # 🔍 Check if the message contains an RFID tag
-                        if data.startswith("RFID_SCANNED:"):
-                            rfid_code = data.replace("RFID_SCANNED:", "").strip()
-                            self.current_rfid = rfid_code  # Store RFID
-                            self.rfid_label.setText(f"Scanned RFID: {rfid_code}")  # Update UI
-                            self.item_name_input.setEnabled(True)  # Enable item name input
-                            self.save_button.setEnabled(True)  # Enable Save button
-                        
-                        # ✅ Detect "ENROLL_SUCCESSFUL" and re-enable Save Button
-                        elif data == "ENROLL_SUCCESSFUL":
-                            self.serial_monitor.append("✅ Enrollment Successful!")
-                            self.save_button.setEnabled(True)
-                            self.save_button.setText("💾 Save RFID")  # Restore original text
-
-                        # ❌ Handle Enrollment Failure
-                        elif data == "ENROLL_FAILED":
-                            self.serial_monitor.append("❌ Enrollment Failed. Try Again.")
-                            self.save_button.setEnabled(True)
-                            self.save_button.setText("💾 Save RFID")  # Restore original text
+        # Runs on the asyncio loop; the timestamp follows as soon as each device is ready
+        if self.readers.sync_time():
+            self.serial_monitor.append("📤 Sent: SYNC_TIME")
 
-            except serial.SerialException as e:
-                self.serial_monitor.append(f"⚠️ Serial Read Error: {str(e)}")
+    def handle_time_synced(self, reader_id, current_time):
+        self.serial_monitor.append(f"📤 Sent [{reader_id}]: {current_time}")
+
+    def handle_serial_lines(self, lines):
+        """Handle a batch of (received_at, reader_id, line) from all readers."""
+        with SERIAL_BATCH_SECONDS.time():
+            for received_at, reader_id, data in lines:
+                self.handle_serial_line(reader_id, data)
+
+    def handle_serial_line(self, reader_id, data):
+        # 🔍 Check if the message contains an RFID tag
+        rfid_code = scanned_rfid(data)
+        item_name = self.tag_registry.get(rfid_code) if rfid_code else None
+        if item_name is not None:
+            self.serial_monitor.append(f"📥 Received [{reader_id}]: {data} ({item_name})")
+        else:
+            self.serial_monitor.append(f"📥 Received [{reader_id}]: {data}")
 
-    def read_serial_data(self):
-        """Reads data from the serial port and updates the monitor."""
+        if rfid_code is not None and not self.readers.bulk:
+            self.current_rfid = rfid_code  # Store RFID
+            self.current_reader = reader_id  # Enroll on the reader that scanned it
+            if item_name is not None:
+                # Enrolled tags cannot be enrolled again
+                self.rfid_label.setText(f"Scanned RFID: {rfid_code}\nAlready enrolled as: {item_name}")
+                self.item_name_input.setEnabled(False)
+                self.save_button.setEnabled(False)
+                return
+            self.rfid_label.setText(f"Scanned RFID: {rfid_code}")  # Update UI
+            self.item_name_input.setEnabled(True)  # Enable item name input
+            self.save_button.setEnabled(True)  # Enable Save button
+
+    def handle_enroll_finished(self, reader_id, rfid, item_name, success, error):
+        """Result of the ENROLL sent by save_rfid: a reply or a timeout."""
+        if success:
+            self.tag_registry.add(rfid, item_name)
+            self.serial_monitor.append("✅ Enrollment Successful!")
+        elif error:
+            self.serial_monitor.append(f"❌ Enrollment Failed ({error}). Try Again.")
+        else:
+            self.serial_monitor.append("❌ Enrollment Failed. Try Again.")
+        # Re-enable Save Button
+        self.save_button.setEnabled(True)
+        self.save_button.setText("💾 Save RFID")  # Restore original text
+
+    def load_bulk_names(self):
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Load Item Names", "", "Item lists (*.csv *.txt);;All files (*)"
+        )
+        if not path:
+            return
         try:
-            if self.serial_port and self.serial_port.is_open:
-                data = self.serial_port.readline().decode('utf-8').strip()
-                if data:
-                    self.serial_monitor.append(f"📥 Received: {data}")
-        except serial.SerialException as e:
-            self.serial_monitor.append(f"⚠️ Serial Read Error: {e}")
-            self.disconnect_serial()  # Close the connection properly
-
-    def disconnect_serial(self):
-        """Safely disconnects the serial port."""
-        if self.serial_port and self.serial_port.is_open:
-            self.serial_port.close()
-            self.serial_monitor.append("❌ Serial Disconnected.")
-            self.serial_port = None
+            self.bulk_names = read_item_names(path)
+        except (OSError, UnicodeDecodeError) as e:
+            self.serial_monitor.append(f"❌ Could not read {path}: {e}")
+            return
+        self.bulk_status_label.setText(f"{len(self.bulk_names)} names loaded")
+        self.update_bulk_ui()
+
+    def update_bulk_ui(self):
+        running = self.readers.bulk is not None
+        continuous = self.bulk_continuous_checkbox.isChecked()
+        self.bulk_start_button.setText("⏹ Stop Bulk Enrollment" if running else "▶ Start Bulk Enrollment")
+        self.bulk_start_button.setEnabled(running or continuous or bool(self.bulk_names))
+        self.bulk_load_button.setEnabled(not running)
+        self.bulk_continuous_checkbox.setEnabled(not running)
+        self.bulk_name_input.setEnabled(running and continuous)
+        # Single enrollment waits while the reader is busy scanning
+        self.scan_rfid_button.setEnabled(not running)
+        if running:
+            self.item_name_input.setEnabled(False)
+            self.save_button.setEnabled(False)
+
+    def toggle_bulk_enroll(self):
+        if self.readers.bulk:
+            self.readers.stop_bulk_enroll()
+            self.bulk_start_button.setEnabled(False)  # Until the sent enrollments finish
+            return
+
+        reader_id = self.selected_reader()
+        if not reader_id:
+            self.serial_monitor.append("❌ No Serial Connection")
+            return
+        continuous = self.bulk_continuous_checkbox.isChecked()
+        names = [] if continuous else self.bulk_names
+
+        self.bulk_counts = {"scanned": 0, "enrolled": 0, "failed": 0, "total": len(names)}
+        self.readers.start_bulk_enroll(reader_id, names, continuous, enrolled_item=self.tag_registry.get)
+        self.serial_monitor.append(f"📦 Bulk enrollment started on {reader_id}. Place the tags near the scanner one by one.")
+        self.update_bulk_status()
+        self.update_bulk_ui()
 
+    def add_bulk_name(self):
+        name = normalize_item_name(self.bulk_name_input.text())
+        if name:
+            self.readers.add_bulk_name(name)
+            self.bulk_name_input.clear()
+
+    def update_bulk_status(self):
+        counts = self.bulk_counts
+        text = f"{counts['scanned']} scanned, {counts['enrolled']} enrolled, {counts['failed']} failed"
+        if counts["total"]:
+            text += f" of {counts['total']} names"
+        self.bulk_status_label.setText(text)
+
+    def handle_bulk_scanned(self, rfid, duplicate):
+        if duplicate:
+            item_name = self.tag_registry.get(rfid)
+            if item_name is not None:
+                self.serial_monitor.append(f"⚠️ {rfid} is already enrolled as {item_name}, skipped")
+            else:
+                self.serial_monitor.append(f"⚠️ {rfid} was already scanned, ignored")
+            return
+        self.bulk_counts["scanned"] += 1
+        self.update_bulk_status()
+
+    def handle_bulk_enrolled(self, rfid, item_name, success, error):
+        if success:
+            self.tag_registry.add(rfid, item_name)
+            self.bulk_counts["enrolled"] += 1
+            self.serial_monitor.append(f"✅ Enrolled {item_name} ({rfid})")
+        else:
+            self.bulk_counts["failed"] += 1
+            self.serial_monitor.append(f"❌ Enrollment of {item_name} ({rfid}) failed: {error}")
+        self.update_bulk_status()
+
+    def handle_bulk_finished(self, bulk):
+        if bulk is not self.readers.bulk:
+            return
+        self.readers.bulk = None
+        self.serial_monitor.append(f"📦 Bulk enrollment finished: {bulk.summary()}")
+        if bulk.error:
+            self.serial_monitor.append(f"❌ Stopped early: {bulk.error}")
+        for result in bulk.failed:
+            self.serial_monitor.append(f"   ❌ {result.item} ({result.rfid}): {result.error}")
+        # Start again to retry the names that were not enrolled
+        names, _ = bulk.remaining()
+        self.bulk_names = [] if bulk.continuous else [result.item for result in bulk.failed] + names
+        summary = bulk.summary()
+        if self.bulk_names:
+            summary += f". Start again to retry {len(self.bulk_names)} names."
+        self.bulk_status_label.setText(summary)
+        self.update_bulk_ui()
+
+    def selected_reader(self):
+        """The reader selected in the port list, or the first one connected (None if none is)."""
+        reader_ids = self.readers.reader_ids()
+        if not reader_ids:
+            return None
+        port = self.serial_combo.currentText()
+        return port if port in reader_ids else reader_ids[0]
 
     def scan_rfid(self):
-        if self.serial_port and self.serial_port.is_open:
-            self.serial_monitor.append("🔍 Scanning RFID...")
-            self.serial_port.write(b"SCAN_NOW\n")  # Send command to Arduino
+        reader_id = self.selected_reader()
+        if reader_id:
+            self.serial_monitor.append(f"🔍 Scanning RFID on {reader_id}...")
+            self.readers.write(SCAN_NOW, reader_id)  # Only this gate answers, and enrolls the tag
             self.rfid_label.setText("Scanned RFID: None")  # Reset RFID label
         else:
             self.serial_monitor.append("❌ No Serial Connection")
@@ -400,32 +1239,43 @@ class RFIDApp(QMainWindow):
             self.serial_monitor.append("⚠️ Item name cannot be empty!")
             return  # Stop execution if item name is missing
 
-        # Normalize spaces (replace multiple spaces with a single space)
-        item_name = re.sub(r'\s+', ' ', item_name)
+        enrolled_as = self.tag_registry.get(self.current_rfid) if self.current_rfid else None
+        if enrolled_as is not None:
+            self.serial_monitor.append(f"⚠️ {self.current_rfid} is already enrolled as {enrolled_as}!")
+            return  # Blocked before anything is sent to the device
 
-        if self.current_rfid and self.serial_port and self.serial_port.is_open:
-            message = f"ENROLL\n{item_name},{self.current_rfid}\n"
-            self.serial_port.write(message.encode())  # Send message
-            self.serial_monitor.append(f"📤 Sent:\n{message.strip()}")
+        if self.current_rfid and self.current_reader in self.readers.reader_ids():
+            item_name = normalize_item_name(item_name)
+            self.readers.enroll(self.current_reader, item_name, self.current_rfid)  # Send message
+            self.serial_monitor.append(f"📤 Sent:\nENROLL\n{item_name},{self.current_rfid}")
 
             # Disable Save Button and Change Text to "SAVING..."
             self.save_button.setEnabled(False)
             #self.save_button.setText("⏳ SAVING...")
 
-            # Reset UI inputs but keep button disabled until "ENROLL_SUCCESSFUL"
+            # Reset UI inputs but keep button disabled until the device answers
             self.item_name_input.clear()
             self.rfid_label.setText("Scanned RFID: None")
             self.current_rfid = None
+            self.current_reader = None
             self.item_name_input.setEnabled(False)
         else:
             self.serial_monitor.append("❌ No scanned RFID or serial connection!")
-    def clear_logs(self):
-        """ Clear all logs from the table and delete file content """
-        self.logs_table.setRowCount(0)  # Clears the table
 
-        # Overwrite data.txt with an empty file
-        with open("data.txt", "w") as file:
-            file.truncate(0)  # Clears file content
+    def closeEvent(self, event):
+        self.readers.close()
+        self.tag_registry.close()
+        if self.metrics_server:
+            self.metrics_server.shutdown()
+        super().closeEvent(event)
+
+    def clear_logs(self):
+        """ Clear all logs from the table and the log store """
+        self.logs_model.clear()  # Clears the table
+        self.log_store.clear()
+        self.inventory.clear()
+        self.inventory_model.reset()
+        self.update_inventory_summary()
         
         print("Logs cleared.")  # Debugging message
 
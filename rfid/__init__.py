@@ -0,0 +1 @@
+"""Core RFID tool-tracking logic shared by the GUI (main.py)."""
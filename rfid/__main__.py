@@ -0,0 +1,5 @@
+import sys
+
+from rfid.cli import main
+
+sys.exit(main())
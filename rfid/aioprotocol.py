@@ -0,0 +1,237 @@
+"""asyncio front end for the reader protocol.
+
+Every command is an awaitable with its own deadline. Replies are matched to
+commands in the order they were sent (the device answers in order), so
+several commands can be in flight at once. Reading still happens on a
+LineReader thread; its lines are handed to the event loop.
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+
+import serial
+
+from rfid import metrics
+from rfid.protocol import (
+    LineReader, time_message, enroll_message, scanned_rfid,
+    SCAN_NOW, SYNC_LOGS, SYNC_TIME, SYNC_TIME_DELAY,
+    RFID_SCANNED, ENROLL_SUCCESSFUL, ENROLL_FAILED, TIME_READY,
+)
+
+# The Arduino serial receive buffer is 64 bytes. Commands are sent only while
+# the bytes of all unanswered commands fit in it; a longer command (an ENROLL
+# with a long item name) is sent on its own once everything else is answered.
+MAX_IN_FLIGHT_BYTES = 64
+SCAN_TIMEOUT = 10.0
+ENROLL_TIMEOUT = 5.0
+
+COMMAND_SECONDS = metrics.histogram("command_seconds", "Time from sending a command to its reply")
+COMMAND_TIMEOUTS = metrics.counter("command_timeouts", "Commands without a reply before their deadline")
+
+
+class CommandTimeout(Exception):
+    """The device did not answer a command before its deadline."""
+
+
+class LoopThread:
+    """An asyncio event loop running forever on its own daemon thread."""
+
+    def __init__(self, name="rfid-asyncio"):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro):
+        """Schedule ``coro`` from any thread. Returns a concurrent.futures.Future."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+
+class AsyncReader:
+    """One reader driven from an asyncio event loop.
+
+    Coroutines (``scan``, ``enroll``, ``sync_time``, ``sync_logs``) must run
+    on ``loop``; ``send``, ``start_log_sync``, ``cancel_log_sync`` and
+    ``close`` may be called from any thread. Callbacks run on the loop
+    thread: ``on_lines`` gets every received (received_at, line) batch,
+    including lines that answered a command.
+    """
+
+    def __init__(self, serial_port, loop, on_lines=None, on_sync_progress=None,
+                 on_sync_finished=None, on_connection_lost=None, max_in_flight_bytes=MAX_IN_FLIGHT_BYTES):
+        self.serial_port = serial_port
+        self.loop = loop
+        self.on_lines = on_lines or (lambda batch: None)
+        self.on_sync_progress = on_sync_progress or (lambda lines, size: None)
+        self.on_sync_finished = on_sync_finished or (lambda success, error: None)
+        self.on_connection_lost = on_connection_lost or (lambda error: None)
+
+        self.line_reader = LineReader(
+            serial_port,
+            on_lines=lambda: loop.call_soon_threadsafe(self._dispatch),
+            on_sync_progress=lambda lines, size: loop.call_soon_threadsafe(self.on_sync_progress, lines, size),
+            on_sync_finished=lambda success, error: loop.call_soon_threadsafe(self._sync_finished, success, error),
+            on_connection_lost=lambda error: loop.call_soon_threadsafe(self._connection_lost, error),
+        )
+        self._pending = deque()  # (reply prefixes, future) in the order the commands were sent
+        self._max_in_flight_bytes = max_in_flight_bytes
+        self._in_flight_bytes = 0
+        self._waiting = deque()  # Requests not sent yet, oldest first
+        self._window = asyncio.Condition()
+        self._sync_future = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self.line_reader.run, args=(self._stop.is_set,), daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def close(self):
+        """Stop reading, close the port and fail any command still waiting."""
+        self._stop.set()
+        self._thread.join()
+        self.line_reader.abort_log_sync("Disconnected")
+        self.serial_port.close()
+        self.loop.call_soon_threadsafe(self._fail_pending, ConnectionError("Disconnected"))
+
+    # Fire-and-forget (thread-safe)
+
+    def send(self, data):
+        self.loop.call_soon_threadsafe(self._write, data)
+
+    def start_log_sync(self, log_sync):
+        """Start a SYNC_LOGS transfer into ``log_sync``; see on_sync_finished."""
+        self.line_reader.start_log_sync(log_sync)
+        self.send(SYNC_LOGS)
+
+    def cancel_log_sync(self):
+        self.line_reader.cancel_log_sync()
+
+    # Awaitable commands (loop thread)
+
+    async def request(self, data, replies, timeout, optional=False):
+        """Send ``data`` and return the first line starting with one of ``replies``.
+
+        Requests wait for a reply at the same time only while their bytes add
+        up to at most ``max_in_flight_bytes``; later ones are sent as earlier
+        ones are answered. A missing reply raises CommandTimeout and counts in
+        COMMAND_TIMEOUTS. The device may still answer later, so its late reply
+        is dropped instead of answering the next command. Pass ``optional``
+        for replies that older firmware never sends: their timeout is neither
+        counted nor waited out.
+        """
+        size = len(data)
+        turn = object()
+        async with self._window:
+            # First come, first sent: a long command is not overtaken by short ones
+            self._waiting.append(turn)
+            try:
+                await self._window.wait_for(
+                    lambda: self._waiting[0] is turn and (
+                        not self._in_flight_bytes
+                        or self._in_flight_bytes + size <= self._max_in_flight_bytes))
+            finally:
+                self._waiting.remove(turn)
+                self._window.notify_all()
+            self._in_flight_bytes += size
+        future = self.loop.create_future()
+        entry = (replies, future)
+        self._pending.append(entry)
+        try:
+            self._write(data)
+            started = time.perf_counter()
+            reply = await asyncio.wait_for(future, timeout)
+            COMMAND_SECONDS.observe(time.perf_counter() - started)
+            return reply
+        except asyncio.TimeoutError:
+            if not optional:
+                COMMAND_TIMEOUTS.inc()
+            command = data.split(b"\n")[0].decode()
+            raise CommandTimeout(f"No reply to {command} within {timeout:g}s") from None
+        finally:
+            # An unanswered entry stays pending, with its future cancelled,
+            # until its late reply arrives and is dropped in _dispatch
+            if optional and entry in self._pending:
+                self._pending.remove(entry)
+            async with self._window:
+                self._in_flight_bytes -= size
+                self._window.notify_all()
+
+    async def scan(self, timeout=SCAN_TIMEOUT):
+        """SCAN_NOW; returns the UID of the scanned tag."""
+        return scanned_rfid(await self.request(SCAN_NOW, (RFID_SCANNED,), timeout))
+
+    async def enroll(self, item_name, rfid, timeout=ENROLL_TIMEOUT):
+        """ENROLL; returns True on ENROLL_SUCCESSFUL and False on ENROLL_FAILED."""
+        reply = await self.request(enroll_message(item_name, rfid), (ENROLL_SUCCESSFUL, ENROLL_FAILED), timeout)
+        return reply == ENROLL_SUCCESSFUL
+
+    async def sync_time(self, ready_timeout=SYNC_TIME_DELAY):
+        """SYNC_TIME, then the current time as soon as the device is ready.
+
+        Firmware that answers SYNC_TIME with TIME_READY gets the timestamp
+        right away; older firmware gets it after ``ready_timeout``, like the
+        fixed delay before, but without blocking anything. Returns the
+        timestamp that was sent.
+        """
+        try:
+            await self.request(SYNC_TIME, (TIME_READY,), ready_timeout, optional=True)
+        except CommandTimeout:
+            pass
+        message = time_message()
+        self._write(message)
+        return message.decode().strip()
+
+    async def sync_logs(self, log_sync):
+        """Run a SYNC_LOGS transfer to completion. Returns (success, error)."""
+        self._sync_future = self.loop.create_future()
+        self.start_log_sync(log_sync)
+        return await self._sync_future
+
+    # Loop thread internals
+
+    def _write(self, data):
+        try:
+            self.serial_port.write(data)
+        except (serial.SerialException, OSError):
+            pass  # The reader thread reports the lost connection
+
+    def _dispatch(self):
+        batch = self.line_reader.drain()
+        for received_at, line in batch:
+            for entry in self._pending:
+                replies, future = entry
+                if line.startswith(replies):
+                    # The oldest command expecting this reply gets it, even
+                    # if it has given up waiting
+                    self._pending.remove(entry)
+                    if not future.done():
+                        future.set_result(line)
+                    break
+        if batch:
+            self.on_lines(batch)
+
+    def _sync_finished(self, success, error):
+        if self._sync_future and not self._sync_future.done():
+            self._sync_future.set_result((success, error))
+        self.on_sync_finished(success, error)
+
+    def _connection_lost(self, error):
+        self._fail_pending(ConnectionError(error))
+        self.on_connection_lost(error)
+
+    def _fail_pending(self, error):
+        for replies, future in self._pending:
+            if not future.done():
+                future.set_exception(error)
+        self._pending.clear()
+        if self._sync_future and not self._sync_future.done():
+            self._sync_future.set_result((False, str(error)))
@@ -0,0 +1,256 @@
+"""Headless entry point: ``python -m rfid collect --port COM3 [--port COM4 ...]``.
+
+``python -m rfid simulate`` runs a simulated reader to test against.
+
+Collects logs from the readers into the log store without the GUI (Qt is
+never imported), so it can run as a service on a machine without a display.
+"""
+import argparse
+import logging
+import queue
+import signal
+import threading
+import time
+
+import serial
+import serial.tools.list_ports
+
+from rfid import metrics
+from rfid.protocol import (
+    LineReader, open_port, time_message, scanned_rfid, SYNC_LOGS, SYNC_TIME, SYNC_TIME_DELAY, TIME_READY,
+)
+from rfid.storage import open_log_store
+from rfid.sync import LogSync, SyncGroup
+
+logger = logging.getLogger("rfid.collect")
+
+
+class Collector:
+    """Keeps readers connected, logs their messages and syncs their logs periodically.
+
+    Reader threads only post events to a queue; everything else happens on
+    the thread that calls ``run``.
+    """
+
+    def __init__(self, ports, store, sync_interval=300.0, sync_time=False, reconnect_interval=5.0):
+        self.ports = ports
+        self.store = store
+        self.sync_interval = sync_interval
+        self.sync_time = sync_time
+        self.reconnect_interval = reconnect_interval
+
+        self.events = queue.Queue()
+        self.readers = {}  # Reader ID (port) -> (LineReader, thread, stop event)
+        self.next_connect = {port: 0.0 for port in ports}
+        self.next_sync = 0.0
+        self.sync_pending = set()
+        self.sync_errors = []
+        self.time_due = []  # (monotonic deadline, reader ID) for the timestamp after SYNC_TIME
+
+    def run(self, stop):
+        """Run until the ``stop`` event is set."""
+        try:
+            while not stop.is_set():
+                now = time.monotonic()
+                self._connect_due(now)
+                self._send_time_due(now)
+                # Not between SYNC_TIME and its timestamp: the device would take SYNC_LOGS for the time
+                if now >= self.next_sync and self.readers and not self.sync_pending and not self.time_due:
+                    self.start_sync()
+                try:
+                    event = self.events.get(timeout=0.2)
+                except queue.Empty:
+                    continue
+                self._handle(*event)
+        finally:
+            for reader_id in list(self.readers):
+                self._disconnect(reader_id)
+            self.store.close()
+
+    def start_sync(self):
+        self.next_sync = time.monotonic() + self.sync_interval
+        group = SyncGroup(self.store, len(self.readers))
+        self.sync_pending = set(self.readers)
+        self.sync_errors = []
+        for reader_id, (reader, _, _) in self.readers.items():
+            reader.start_log_sync(LogSync(self.store, group, reader_id))
+        for reader_id, (reader, _, _) in self.readers.items():
+            try:
+                reader.write(SYNC_LOGS)
+            except (serial.SerialException, OSError):
+                reader.cancel_log_sync()  # Reported through sync_finished
+        logger.info("Sent SYNC_LOGS to %s", ", ".join(self.readers))
+
+    def _connect_due(self, now):
+        for port, due in self.next_connect.items():
+            if port in self.readers or now < due:
+                continue
+            try:
+                serial_port = open_port(port)
+            except serial.SerialException as e:
+                logger.warning("Cannot open %s: %s", port, e)
+                self.next_connect[port] = now + self.reconnect_interval
+                continue
+
+            stop = threading.Event()
+            reader = LineReader(
+                serial_port,
+                on_lines=lambda port=port: self.events.put(("lines", port)),
+                on_sync_progress=lambda lines, size: None,
+                on_sync_finished=lambda success, error, port=port: self.events.put(("sync_finished", port, success, error)),
+                on_connection_lost=lambda error, port=port: self.events.put(("lost", port, error)),
+            )
+            thread = threading.Thread(target=reader.run, args=(stop.is_set,), name=f"reader-{port}", daemon=True)
+            self.readers[port] = (reader, thread, stop)
+            thread.start()
+            logger.info("Connected to %s", port)
+
+            if self.sync_time and self._write(port, SYNC_TIME):
+                self.time_due.append((now + SYNC_TIME_DELAY, port))
+
+    def _send_time_due(self, now, ready_reader=None):
+        """Send the timestamp once the delay has passed or the device said TIME_READY."""
+        for due, reader_id in list(self.time_due):
+            if due > now and reader_id != ready_reader:
+                continue
+            self.time_due.remove((due, reader_id))
+            if reader_id in self.readers and self._write(reader_id, time_message()):
+                logger.info("Synced time on %s", reader_id)
+
+    def _write(self, reader_id, data):
+        """Write to a reader. Returns False if its port is gone; it is then reconnected."""
+        try:
+            self.readers[reader_id][0].write(data)
+            return True
+        except (serial.SerialException, OSError) as e:
+            self.events.put(("lost", reader_id, str(e)))
+            return False
+
+    def _disconnect(self, reader_id):
+        reader, thread, stop = self.readers.pop(reader_id)
+        stop.set()
+        thread.join()
+        reader.abort_log_sync("Disconnected")
+        reader.serial_port.close()
+        self.next_connect[reader_id] = time.monotonic() + self.reconnect_interval
+        if reader_id in self.sync_pending:
+            self._sync_finished(reader_id, False, "Disconnected")
+
+    def _handle(self, kind, reader_id, *args):
+        if kind == "lines" and reader_id in self.readers:
+            for received_at, line in self.readers[reader_id][0].drain():
+                if line == TIME_READY:
+                    self._send_time_due(time.monotonic(), ready_reader=reader_id)
+                rfid = scanned_rfid(line)
+                if rfid is not None:
+                    logger.info("[%s] Scanned %s", reader_id, rfid)
+                else:
+                    logger.info("[%s] %s", reader_id, line)
+        elif kind == "sync_finished":
+            self._sync_finished(reader_id, *args)
+        elif kind == "lost" and reader_id in self.readers:
+            logger.warning("Device disconnected: %s (%s)", reader_id, args[0])
+            self._disconnect(reader_id)
+
+    def _sync_finished(self, reader_id, success, error):
+        if reader_id not in self.sync_pending:
+            return
+        self.sync_pending.discard(reader_id)
+        if not success:
+            self.sync_errors.append(f"{reader_id}: {error}")
+        if not self.sync_pending:
+            if self.sync_errors:
+                logger.error("Log sync failed: %s", "; ".join(self.sync_errors))
+            else:
+                logger.info("Log sync complete")
+
+
+def collect(args):
+    store = open_log_store(args.store, text_path=args.data, db_path=args.db, segments_dir=args.segments_dir)
+    collector = Collector(args.port, store, sync_interval=args.sync_interval, sync_time=args.sync_time)
+    if args.metrics_port:
+        metrics.serve_metrics(args.metrics_port)
+        logger.info("Serving metrics on http://127.0.0.1:%d/metrics", args.metrics_port)
+
+    stop = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    collector.run(stop)
+    return 0
+
+
+def simulate(args):
+    # Imported here so collect and ports do not load the simulator
+    from rfid.simulator import SimulatedReader, serve_pty, serve_tcp
+
+    reader = SimulatedReader(
+        log_lines=args.log_lines,
+        bytes_per_second=args.baud / 10 if args.baud else None,
+        scan_delay=args.scan_delay,
+        enroll_failure_rate=args.enroll_failure_rate,
+        time_ready=not args.no_time_ready,
+        seed=args.seed,
+    )
+    address = serve_pty(reader) if args.pty else serve_tcp(reader, port=args.tcp)
+    logger.info("Simulated reader on %s (%d log lines)", address, len(reader.log))
+
+    stop = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    while not stop.wait(1.0):
+        if args.scan_rate and reader.transport:
+            reader.scan_burst(int(args.scan_rate), rate=args.scan_rate)
+    reader.stop()
+    return 0
+
+
+def list_ports(args):
+    for port in serial.tools.list_ports.comports():
+        print(f"{port.device}\t{port.description}")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m rfid", description="RFID tool tracking without the GUI.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    collect_parser = subparsers.add_parser("collect", help="Collect logs from one or more readers.")
+    collect_parser.add_argument("--port", action="append", required=True,
+                                help="Serial port or pyserial URL; repeat for several readers.")
+    collect_parser.add_argument("--store", choices=["sqlite", "segments", "text"], default="sqlite",
+                                help="Log store backend.")
+    collect_parser.add_argument("--db", default="logs.db", help="SQLite database (sqlite store).")
+    collect_parser.add_argument("--segments-dir", default="logs", help="Segment folder (segments store).")
+    collect_parser.add_argument("--data", default="data.txt",
+                                help="Log file (text store); imported once by the sqlite and segments stores.")
+    collect_parser.add_argument("--sync-interval", type=float, default=300.0,
+                                help="Seconds between SYNC_LOGS requests.")
+    collect_parser.add_argument("--sync-time", action="store_true", help="Sync the device time after connecting.")
+    collect_parser.add_argument("--metrics-port", type=int,
+                                help="Serve /metrics (Prometheus) and /metrics.json on this localhost port.")
+    collect_parser.set_defaults(func=collect)
+
+    simulate_parser = subparsers.add_parser("simulate", help="Run a simulated reader for testing without a device.")
+    transport = simulate_parser.add_mutually_exclusive_group()
+    transport.add_argument("--tcp", type=int, default=7777, metavar="PORT",
+                           help="Listen on socket://127.0.0.1:PORT (default 7777).")
+    transport.add_argument("--pty", action="store_true", help="Create a pseudo terminal instead (Linux/macOS).")
+    simulate_parser.add_argument("--log-lines", type=int, default=1000, help="Lines in the device log.")
+    simulate_parser.add_argument("--baud", type=int, default=0,
+                                 help="Throttle log dumps to this baud rate (default: unthrottled).")
+    simulate_parser.add_argument("--scan-rate", type=float, default=0,
+                                 help="Tags per second passing the gate once a host is connected.")
+    simulate_parser.add_argument("--scan-delay", type=float, default=0.05, help="Seconds before SCAN_NOW is answered.")
+    simulate_parser.add_argument("--enroll-failure-rate", type=float, default=0.0,
+                                 help="Fraction of ENROLL requests answered with ENROLL_FAILED.")
+    simulate_parser.add_argument("--no-time-ready", action="store_true",
+                                 help="Do not answer SYNC_TIME with TIME_READY, like older firmware.")
+    simulate_parser.add_argument("--seed", type=int, help="Seed for reproducible tags and logs.")
+    simulate_parser.set_defaults(func=simulate)
+
+    ports_parser = subparsers.add_parser("ports", help="List available serial ports.")
+    ports_parser.set_defaults(func=list_ports)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    return args.func(args)
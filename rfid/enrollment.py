@@ -0,0 +1,188 @@
+"""Bulk enrollment: scan many tags in a row and enroll them with their names.
+
+Tags are scanned one after the other (SCAN_NOW) and queued, with repeated
+scans of the same tag ignored, as are tags that are already enrolled. Each
+queued tag is paired with the next item name, either from a list loaded up
+front or typed by the operator while scanning continues. The firmware
+handles one command at a time and stays in SCAN_NOW until a tag arrives, so
+an ENROLL is sent as soon as the reader is not waiting for a tag, and the
+next scan starts once every ENROLL has been answered.
+"""
+import asyncio
+import csv
+from collections import deque
+
+from rfid.aioprotocol import CommandTimeout
+from rfid.protocol import normalize_item_name, ENROLL_FAILED
+
+HEADER_NAMES = {"item", "item name", "name"}  # First row of a CSV that is a header, not an item
+
+
+def read_item_names(path):
+    """Item names from a CSV (first column) or plain text file (one per line).
+
+    Blank rows and a header row (``item``, ``item name`` or ``name``) are
+    skipped. Names are normalized like in single enrollment.
+    """
+    names = []
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        for row in csv.reader(f):
+            if not row:
+                continue
+            name = normalize_item_name(row[0])
+            if not name or (not names and name.lower() in HEADER_NAMES):
+                continue
+            names.append(name)
+    return names
+
+
+class EnrollmentResult:
+    __slots__ = ("rfid", "item", "success", "error")
+
+    def __init__(self, rfid, item, success, error=""):
+        self.rfid = rfid
+        self.item = item
+        self.success = success
+        self.error = error
+
+
+class BulkEnrollment:
+    """One bulk enrollment session on one AsyncReader.
+
+    With ``names`` the session ends once every name has been enrolled (or
+    ``stop`` is called); with ``continuous=True`` it keeps scanning until
+    ``stop`` and names are added with ``add_name``. Everything runs on the
+    reader's event loop; callbacks are called there too.
+    """
+
+    def __init__(self, reader, names=(), continuous=False, on_scanned=None, on_enrolled=None, enrolled_item=None):
+        self.reader = reader
+        self.continuous = continuous
+        self.enrolled_item = enrolled_item or (lambda rfid: None)  # Item a tag is already enrolled as
+        self.on_scanned = on_scanned or (lambda rfid, duplicate: None)
+        self.on_enrolled = on_enrolled or (lambda result: None)
+
+        self.names = deque(normalize_item_name(name) for name in names if name.strip())
+        self.tags = deque()  # Scanned tags waiting for a name
+        self.seen = set()  # Every tag scanned in this session
+        self.duplicates = 0
+        self.already_enrolled = 0
+        self.results = []
+        self.error = None  # Why the session ended early, if it did
+
+        self._enrolling = set()
+        self._stopping = False
+        self._scanner = None
+        self._scan_idle = asyncio.Event()  # Cleared while the reader waits for a tag
+        self._scan_idle.set()
+
+    @property
+    def succeeded(self):
+        return [result for result in self.results if result.success]
+
+    @property
+    def failed(self):
+        return [result for result in self.results if not result.success]
+
+    def remaining(self):
+        """Names without a tag and tags without a name when the session ended."""
+        return list(self.names), list(self.tags)
+
+    async def run(self):
+        """Scan and enroll until done or stopped. Returns self."""
+        self._scanner = asyncio.ensure_future(self._scan_loop())
+        try:
+            await self._scanner
+        except asyncio.CancelledError:
+            if not self._stopping:
+                raise
+        if not self._scan_idle.is_set():
+            # Stopped during a scan: the reader still waits for a tag and
+            # would not answer an ENROLL, so pairs not sent yet are left over
+            for task in self._enrolling:
+                task.cancel()
+        while self._enrolling:
+            await asyncio.gather(*self._enrolling, return_exceptions=True)
+        return self
+
+    def add_name(self, name):
+        """Name the oldest unnamed tag (or the next one to be scanned)."""
+        name = normalize_item_name(name)
+        if name:
+            self.names.append(name)
+            self._pair()
+
+    def stop(self):
+        """Stop scanning; enrollments already sent still finish."""
+        self._stopping = True
+        if self._scanner:
+            self._scanner.cancel()
+
+    def summary(self):
+        text = f"{len(self.succeeded)} enrolled, {len(self.failed)} failed"
+        if self.duplicates:
+            text += f", {self.duplicates} duplicate scans ignored"
+        if self.already_enrolled:
+            text += f", {self.already_enrolled} already enrolled"
+        names, tags = self.remaining()
+        if names:
+            text += f", {len(names)} names without a tag"
+        if tags:
+            text += f", {len(tags)} tags without a name"
+        return text
+
+    def _done_scanning(self):
+        return self._stopping or (not self.continuous and not self.names)
+
+    async def _scan_loop(self):
+        while not self._done_scanning():
+            while self._enrolling:
+                await asyncio.gather(*self._enrolling, return_exceptions=True)
+            if self._done_scanning():
+                return
+            self._scan_idle.clear()
+            try:
+                # No deadline: the reader answers when a tag arrives, and
+                # sending SCAN_NOW again would only queue up more scans
+                rfid = await self.reader.scan(timeout=None)
+            except ConnectionError as e:
+                self.error = str(e)
+                self._scan_idle.set()
+                return
+            self._scan_idle.set()
+            if not rfid:
+                continue
+            duplicate = rfid in self.seen
+            known = not duplicate and self.enrolled_item(rfid) is not None
+            self.on_scanned(rfid, duplicate or known)
+            if duplicate:
+                self.duplicates += 1
+                continue
+            if known:
+                self.already_enrolled += 1
+                self.seen.add(rfid)
+                continue
+            self.seen.add(rfid)
+            self.tags.append(rfid)
+            self._pair()
+
+    def _pair(self):
+        while self.tags and self.names:
+            task = asyncio.ensure_future(self._enroll(self.tags.popleft(), self.names.popleft()))
+            self._enrolling.add(task)
+            task.add_done_callback(self._enrolling.discard)
+
+    async def _enroll(self, rfid, item):
+        try:
+            await self._scan_idle.wait()
+        except asyncio.CancelledError:
+            self.tags.append(rfid)
+            self.names.append(item)
+            return
+        try:
+            success = await self.reader.enroll(item, rfid)
+            result = EnrollmentResult(rfid, item, success, "" if success else ENROLL_FAILED)
+        except (CommandTimeout, ConnectionError) as e:
+            result = EnrollmentResult(rfid, item, False, str(e) or type(e).__name__)
+        self.results.append(result)
+        self.on_enrolled(result)
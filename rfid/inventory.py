@@ -0,0 +1,78 @@
+from rfid.parsing import LogBlock, format_timestamp, parse_timestamp
+
+CHECKED_OUT = "Exit"  # Last action of a tool that is not in the toolroom
+
+
+class TagState:
+    """Current state of one RFID tag, as of its most recent log event."""
+
+    __slots__ = ("rfid", "item", "last_action", "_last_seen", "last_time")
+
+    def __init__(self, rfid, item, last_action, last_seen, last_time):
+        self.rfid = rfid
+        self.item = item
+        self.last_action = last_action
+        self._last_seen = last_seen  # Timestamp text, None to format last_time
+        self.last_time = last_time  # Epoch seconds, None if unparseable
+
+    @property
+    def last_seen(self):
+        if self._last_seen is None and self.last_time is not None:
+            return format_timestamp(self.last_time)
+        return self._last_seen
+
+    @property
+    def checked_out(self):
+        return self.last_action == CHECKED_OUT
+
+
+class Inventory:
+    """Which tools are in or out, folded from Entry/Exit events one at a time.
+
+    Each event is a single dict lookup, so the state can be kept current as
+    logs stream in instead of rescanning the whole history.
+    """
+
+    def __init__(self):
+        self.tags = {}  # RFID -> TagState
+
+    def clear(self):
+        self.tags = {}
+
+    def apply(self, timestamp, rfid, item, action):
+        """Fold one event into the state. Returns the updated TagState, or None
+        if the event is older than what is already known for the tag."""
+        return self._apply(parse_timestamp(timestamp), timestamp, rfid, item, action)
+
+    def _apply(self, ts, timestamp, rfid, item, action):
+        state = self.tags.get(rfid)
+        if state is None:
+            state = self.tags[rfid] = TagState(rfid, item, action, timestamp, ts)
+            return state
+
+        if ts is not None and state.last_time is not None and ts < state.last_time:
+            return None  # Out-of-order event, keep the newer state
+
+        state.item = item
+        state.last_action = action
+        state._last_seen = timestamp
+        state.last_time = ts
+        return state
+
+    def apply_rows(self, rows):
+        """Fold a LogBlock or (timestamp, rfid, item, action) rows. Returns the set of changed RFIDs."""
+        changed = set()
+        if isinstance(rows, LogBlock):
+            # Timestamps are already parsed; last_seen is formatted when shown
+            for ts, rfid, item, action in zip(rows.times, rows.rfids, rows.items, rows.actions):
+                if self._apply(ts, None, rfid, item, action):
+                    changed.add(rfid)
+            return changed
+        for timestamp, rfid, item, action in rows:
+            if self.apply(timestamp, rfid, item, action):
+                changed.add(rfid)
+        return changed
+
+    def checked_out(self):
+        """Tags whose last event was an Exit, i.e. tools that are missing right now."""
+        return [state for state in self.tags.values() if state.checked_out]
@@ -0,0 +1,92 @@
+import os
+import tempfile
+
+FINGERPRINT_SIZE = 64  # Bytes before the checkpoint used to detect rewrites
+
+# The umask can only be read by setting it, so it is read once, at import
+_UMASK = os.umask(0o022)
+os.umask(_UMASK)
+
+
+def make_temp_file(directory, prefix):
+    """``tempfile.mkstemp`` for a file that is moved into place with ``os.replace``.
+
+    mkstemp creates files readable only by their owner; this gives the file
+    the permissions ``open`` would (0666 minus the umask), like the file it
+    replaces had. Returns ``(fd, path)``.
+    """
+    fd, path = tempfile.mkstemp(prefix=prefix, suffix=".tmp", dir=directory)
+    os.chmod(path, 0o666 & ~_UMASK)
+    return fd, path
+
+
+class LogTail:
+    """Reads only the lines appended to a log file since the last call.
+
+    The checkpoint is the byte offset just after the last complete line, plus
+    the file identity (device/inode), size and mtime and the bytes right before
+    the offset. If the file was replaced (e.g. by a log sync) or truncated
+    (e.g. by Clear Logs), the next read starts again from the beginning.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.reset()
+
+    def reset(self):
+        self.offset = 0
+        self.identity = None
+        self.size = 0
+        self.mtime = 0
+        self.fingerprint = b""
+
+    def read_new(self):
+        """Return ``(reloaded, lines)``.
+
+        ``reloaded`` is True when the lines start from the top of the file and
+        anything loaded earlier must be discarded. A trailing line without a
+        newline is left for the next call. Raises FileNotFoundError (after
+        resetting the checkpoint) if the file does not exist.
+        """
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            self.reset()
+            raise
+
+        with f:
+            st = os.fstat(f.fileno())
+            identity = (st.st_dev, st.st_ino)
+            reloaded = not self._is_continuation(f, st, identity)
+            if reloaded:
+                self.reset()
+
+            if st.st_size == self.offset and not reloaded:
+                self.mtime = st.st_mtime_ns
+                return False, []
+
+            f.seek(self.offset)
+            data = f.read(st.st_size - self.offset)
+
+        end = data.rfind(b"\n") + 1  # Only consume complete lines
+        self.identity = identity
+        self.size = st.st_size
+        self.mtime = st.st_mtime_ns
+        if end:
+            self.offset += end
+            self.fingerprint = (self.fingerprint + data[:end])[-FINGERPRINT_SIZE:]
+
+        return reloaded, data[:end].decode("utf-8", errors="replace").splitlines()
+
+    def _is_continuation(self, f, st, identity):
+        if self.identity is None:
+            return False
+        if identity != self.identity or st.st_size < self.offset:
+            return False  # Replaced or truncated
+        if st.st_size == self.size and st.st_mtime_ns != self.mtime:
+            return False  # Rewritten in place with the same length
+        if self.fingerprint:
+            f.seek(self.offset - len(self.fingerprint))
+            if f.read(len(self.fingerprint)) != self.fingerprint:
+                return False  # Truncated and refilled past the old offset
+        return True
@@ -0,0 +1,145 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+
+from rfid.parsing import LogBlock
+
+MIN_TIME = -(2 ** 63)
+MAX_TIME = 2 ** 63 - 1
+
+
+class LogIndex:
+    """Log rows in column arrays with lookup tables for filtering.
+
+    The rows are kept in a LogBlock (timestamps as epoch seconds, interned
+    RFID, item and action strings), and each row number is added to a posting
+    list for its RFID, item and action. Row numbers are also kept sorted by
+    time, so a time range is two bisects. A filter starts from the smallest
+    matching posting list or time slice and only checks the remaining
+    conditions on those rows.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.block = LogBlock()
+        self.times = self.block.times
+        self.rfids = self.block.rfids
+        self.items = self.block.items
+        self.actions = self.block.actions
+        self.by_rfid = defaultdict(lambda: array("q"))
+        self.by_item = defaultdict(lambda: array("q"))
+        self.by_action = defaultdict(lambda: array("q"))
+        self._sorted_times = array("q")  # Timestamps in time order
+        self._sorted_rows = array("q")  # Row numbers in the same order
+        self._time_order_stale = False
+
+    def __len__(self):
+        return len(self.times)
+
+    def row(self, row):
+        return self.block[row]
+
+    def append_rows(self, rows):
+        """Add a LogBlock or (timestamp, rfid, item, action) rows. Returns the first new row number.
+
+        Rows whose timestamp cannot be parsed are skipped.
+        """
+        if not isinstance(rows, LogBlock):
+            rows = LogBlock.from_rows(rows)
+        first = len(self.times)
+        self.block.extend(rows)
+        last_time = self._sorted_times[-1] if self._sorted_times else MIN_TIME
+        in_order = not self._time_order_stale
+        for row, ts, rfid, item, action in zip(range(first, len(self.times)), rows.times, rows.rfids, rows.items, rows.actions):
+            self.by_rfid[rfid].append(row)
+            self.by_item[item].append(row)
+            self.by_action[action].append(row)
+            if in_order:
+                if ts < last_time:
+                    in_order = False  # Rebuilt on the next time query
+                else:
+                    last_time = ts
+        if in_order:
+            self._sorted_times.extend(rows.times)
+            self._sorted_rows.extend(range(first, len(self.times)))
+        else:
+            self._time_order_stale = True
+        return first
+
+    def filter(self, text="", action=None, start=None, end=None):
+        """Return the matching row numbers in row order, or None if nothing is filtered.
+
+        ``text`` is a case-insensitive substring of the RFID or item name;
+        ``start`` and ``end`` are inclusive epoch seconds.
+        """
+        criteria = self._criteria(text, action, start, end)
+        if criteria is None:
+            return None
+
+        # Start from the smallest candidate set, then check the rest per row
+        candidates = []  # (rows, already in row order)
+        if criteria["rfids"] is not None:
+            candidates.append((self._text_rows(criteria), False))
+        if action is not None:
+            candidates.append((self.by_action.get(action, array("q")), True))
+        if start is not None or end is not None:
+            candidates.append((self._time_slice(start, end), False))
+        base, in_order = min(candidates, key=lambda candidate: len(candidate[0]))
+
+        if len(candidates) > 1:
+            return sorted(row for row in base if self._matches(row, criteria))
+        return list(base) if in_order else sorted(base)  # Nothing left to check
+
+    def filter_range(self, first, last, text="", action=None, start=None, end=None):
+        """The rows from ``first`` up to (not including) ``last`` that match the
+        same conditions as ``filter``, in row order."""
+        criteria = self._criteria(text, action, start, end)
+        if criteria is None:
+            return list(range(first, last))
+        return [row for row in range(first, last) if self._matches(row, criteria)]
+
+    def _criteria(self, text, action, start, end):
+        if not text and action is None and start is None and end is None:
+            return None
+        rfids = items = None
+        if text:
+            needle = text.casefold()
+            # Only distinct values are searched, not every row
+            rfids = {rfid for rfid in self.by_rfid if needle in rfid.casefold()}
+            items = {item for item in self.by_item if needle in item.casefold()}
+        return {
+            "rfids": rfids,
+            "items": items,
+            "action": action,
+            "start": MIN_TIME if start is None else start,
+            "end": MAX_TIME if end is None else end,
+        }
+
+    def _matches(self, row, criteria):
+        if criteria["rfids"] is not None:
+            if self.rfids[row] not in criteria["rfids"] and self.items[row] not in criteria["items"]:
+                return False
+        if criteria["action"] is not None and self.actions[row] != criteria["action"]:
+            return False
+        return criteria["start"] <= self.times[row] <= criteria["end"]
+
+    def _text_rows(self, criteria):
+        rows = set()
+        for rfid in criteria["rfids"]:
+            rows.update(self.by_rfid[rfid])
+        for item in criteria["items"]:
+            rows.update(self.by_item[item])
+        return rows
+
+    def _time_slice(self, start, end):
+        if self._time_order_stale:
+            order = sorted(range(len(self.times)), key=self.times.__getitem__)
+            self._sorted_rows = array("q", order)
+            self._sorted_times = array("q", (self.times[row] for row in order))
+            self._time_order_stale = False
+
+        lo = 0 if start is None else bisect_left(self._sorted_times, start)
+        hi = len(self._sorted_times) if end is None else bisect_right(self._sorted_times, end)
+        return self._sorted_rows[lo:hi]
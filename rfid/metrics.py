@@ -0,0 +1,220 @@
+"""Lightweight counters and latency histograms for the hot paths.
+
+Metrics are updated per batch (a serial read, a parsed block, a table
+update), not per line, so they are cheap enough to leave on. Every metric is
+thread-safe. ``REGISTRY`` holds the metrics of the whole process; it can be
+shown in the GUI's Diagnostics page, written to a JSON file or served on
+localhost in the Prometheus text format::
+
+    from rfid import metrics
+    LINES = metrics.counter("serial_lines_received", "Lines read from the readers")
+    LINES.inc(len(batch))
+    with metrics.histogram("table_update_seconds", "Time to update the log table").time():
+        ...
+"""
+import bisect
+import json
+import threading
+import time
+from contextlib import contextmanager
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+RATE_WINDOW = 10  # Seconds over which Counter.rate averages
+# Upper bounds (seconds) of the latency buckets, from 0.1 ms to 10 s
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+class Counter:
+    """A value that only goes up, with its recent rate per second."""
+
+    kind = "counter"
+
+    def __init__(self, name, help=""):
+        self.name = name
+        self.help = help
+        self.value = 0
+        self._seconds = deque(maxlen=RATE_WINDOW + 1)  # [whole second, count in that second]
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        second = int(time.monotonic())
+        with self._lock:
+            self.value += amount
+            if self._seconds and self._seconds[-1][0] == second:
+                self._seconds[-1][1] += amount
+            else:
+                self._seconds.append([second, amount])
+
+    def rate(self):
+        """Average per second over the last RATE_WINDOW complete seconds."""
+        now = int(time.monotonic())
+        with self._lock:
+            total = sum(count for second, count in self._seconds if now - RATE_WINDOW <= second < now)
+        return total / RATE_WINDOW
+
+    def snapshot(self):
+        return {"type": self.kind, "value": self.value, "rate": self.rate()}
+
+
+class Histogram:
+    """Counts observations (usually seconds) into fixed buckets."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help="", buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # The last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+            if value > self.max:
+                self.max = value
+
+    @contextmanager
+    def time(self):
+        """Observe the duration of the ``with`` block."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the ``q`` quantile (None if empty)."""
+        with self._lock:
+            counts, count, largest = list(self.counts), self.count, self.max
+        if not count:
+            return None
+        rank = q * count
+        seen = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            seen += bucket_count
+            if seen >= rank:
+                return min(bound, largest)
+        return largest
+
+    def snapshot(self):
+        with self._lock:
+            counts, count, total, largest = list(self.counts), self.count, self.sum, self.max
+        return {
+            "type": self.kind,
+            "count": count,
+            "sum": total,
+            "max": largest,
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+            "buckets": dict(zip([*map(str, self.buckets), "+Inf"], counts)),
+        }
+
+
+class Registry:
+    """All metrics of a process, by name."""
+
+    def __init__(self):
+        self.metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help, **kwargs):
+        with self._lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, help, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is a {metric.kind}, not a {cls.kind}")
+            return metric
+
+    def counter(self, name, help=""):
+        return self._get(Counter, name, help)
+
+    def histogram(self, name, help="", buckets=LATENCY_BUCKETS):
+        return self._get(Histogram, name, help, buckets=buckets)
+
+    def snapshot(self):
+        """Every metric's current values, by name, sorted by name."""
+        with self._lock:
+            metrics = sorted(self.metrics.items())
+        return {name: metric.snapshot() for name, metric in metrics}
+
+    def to_json(self):
+        return json.dumps({"time": time.time(), "metrics": self.snapshot()}, indent=2)
+
+    def write_json(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.to_json())
+
+    def to_prometheus(self, prefix="rfid_"):
+        """The metrics in the Prometheus text exposition format."""
+        lines = []
+        for name, values in self.snapshot().items():
+            name = prefix + name
+            kind = values["type"]
+            lines.append(f"# HELP {name} {self.metrics[name[len(prefix):]].help}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "histogram":
+                cumulative = 0
+                for bound, count in values["buckets"].items():
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{le="{bound}"}} {cumulative}')
+                lines.append(f"{name}_sum {values['sum']}")
+                lines.append(f"{name}_count {values['count']}")
+            else:
+                lines.append(f"{name} {values['value']}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name, help=""):
+    return REGISTRY.counter(name, help)
+
+
+def histogram(name, help="", buckets=LATENCY_BUCKETS):
+    return REGISTRY.histogram(name, help, buckets)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            body, content_type = self.registry.to_prometheus(), "text/plain; version=0.0.4"
+        elif self.path == "/metrics.json":
+            body, content_type = self.registry.to_json(), "application/json"
+        else:
+            self.send_error(404)
+            return
+        data = body.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes would flood the log
+
+
+def serve_metrics(port, registry=REGISTRY, host="127.0.0.1"):
+    """Serve /metrics (Prometheus) and /metrics.json on a daemon thread.
+
+    Only listens on localhost. Returns the server; call ``shutdown()`` to stop it.
+    """
+    handler = type("MetricsHandler", (_MetricsHandler,), {"registry": registry})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
@@ -0,0 +1,216 @@
+"""Parsing of device log lines into rows with epoch-second timestamps.
+
+The device writes lines like ``2025-03-26 12:00:00, 1234567893, Multimeter, Exit``
+but does not always zero-pad its clock: ``2025-3-11 13:7:1`` is a valid
+timestamp too. ``parse_block`` parses many lines at once into a ``LogBlock``,
+which keeps the timestamps as epoch seconds in an ``array("q")`` and the RFID,
+item and action columns as lists of interned strings, so a tag or item name
+repeated on thousands of lines is stored once.
+
+Lines that are empty, malformed or have no valid timestamp are rejected and
+counted. That includes the "Timestamp, RFID Number, Tool Name, Action" header
+the device sends before its log.
+"""
+import datetime
+import sys
+import time
+from array import array
+from itertools import islice
+
+from rfid import metrics
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"  # Also the normalized form of every parsed timestamp
+BLOCK_SIZE = 10000  # Lines per block when streaming a file
+DATE_CACHE_SIZE = 4096  # Distinct dates remembered by parse_timestamp/format_timestamp
+
+LINES_PARSED = metrics.counter("log_lines_parsed", "Log lines parsed into rows")
+LINES_REJECTED = metrics.counter("log_lines_rejected", "Empty, malformed or header log lines skipped")
+PARSE_SECONDS = metrics.histogram("log_parse_seconds", "Time to parse one block of log lines")
+
+DAY = 86400
+_EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+_date_seconds = {}  # Date text as sent ("2025-3-11" or "2025-03-11") -> epoch seconds at midnight
+_date_texts = {}  # Days since the epoch -> "2025-03-11"
+
+
+def _midnight(date):
+    seconds = _date_seconds.get(date)
+    if seconds is None:
+        year, month, day = date.split("-")
+        if len(year) != 4 or not 1 <= len(month) <= 2 or not 1 <= len(day) <= 2:
+            raise ValueError(date)
+        # date() checks the day exists in that month
+        seconds = (datetime.date(int(year), int(month), int(day)).toordinal() - _EPOCH_ORDINAL) * DAY
+        if len(_date_seconds) >= DATE_CACHE_SIZE:
+            _date_seconds.clear()
+        _date_seconds[date] = seconds
+    return seconds
+
+
+def parse_timestamp(text):
+    """Convert a device timestamp such as "2025-3-11 13:7:1" to epoch seconds.
+
+    The device clock has no time zone, so the value is treated as UTC. Dates
+    are looked up in a cache, so only the time of day is computed per line.
+    Returns None if the text is not a timestamp.
+    """
+    try:
+        if len(text) == 19 and text[10] == " " and text[13] == ":" and text[16] == ":":
+            # Zero-padded, as written by this app: fixed positions
+            date = text[:10]
+            hour, minute, second = int(text[11:13]), int(text[14:16]), int(text[17:19])
+        else:
+            date, _, clock = text.partition(" ")
+            hour, minute, second = clock.split(":")
+            if not 1 <= len(hour) <= 2 or not 1 <= len(minute) <= 2 or not 1 <= len(second) <= 2:
+                return None
+            hour, minute, second = int(hour), int(minute), int(second)
+        if not (0 <= hour <= 23 and 0 <= minute <= 59 and 0 <= second <= 61):
+            return None
+        return _midnight(date) + hour * 3600 + minute * 60 + second
+    except ValueError:
+        return None
+
+
+def format_timestamp(ts):
+    """Epoch seconds as zero-padded "YYYY-MM-DD HH:MM:SS" (UTC)."""
+    days, seconds = divmod(ts, DAY)
+    date = _date_texts.get(days)
+    if date is None:
+        date = datetime.date.fromordinal(days + _EPOCH_ORDINAL).isoformat()
+        if len(_date_texts) >= DATE_CACHE_SIZE:
+            _date_texts.clear()
+        _date_texts[days] = date
+    hour, seconds = divmod(seconds, 3600)
+    minute, second = divmod(seconds, 60)
+    return f"{date} {hour:02d}:{minute:02d}:{second:02d}"
+
+
+def parse_log_line(log):
+    """Split one "timestamp, rfid, item, action" line into ``(ts, rfid, item, action)``.
+
+    ``ts`` is epoch seconds. The item name may itself contain commas: the
+    timestamp and RFID are the first two fields and the action is the last
+    one. Returns None for empty or malformed lines and lines without a valid
+    timestamp, such as the header.
+    """
+    # Example log format: "2025-03-26 12:00:00, 1234567893, Multimeter, Exit"
+    parts = log.split(", ")
+    if len(parts) == 4 and log.count(",") == 3:
+        # The common case: no commas in the item name
+        timestamp, rfid, item, action = parts
+    else:
+        parts = log.split(",", 2)
+        if len(parts) != 3:
+            return None
+        timestamp, rfid, rest = parts
+        item, sep, action = rest.rpartition(",")
+        if not sep:
+            return None
+    ts = parse_timestamp(timestamp.strip())
+    if ts is None:
+        return None
+    return ts, rfid.strip(), item.strip(), action.strip()
+
+
+class LogBlock:
+    """Log rows stored by column.
+
+    Indexing and iterating give ``(timestamp, rfid, item, action)`` rows like
+    the rest of the app uses, with the timestamp in the normalized
+    zero-padded form. ``times`` has the same timestamps as epoch seconds.
+    """
+
+    __slots__ = ("times", "rfids", "items", "actions")
+
+    def __init__(self):
+        self.times = array("q")
+        self.rfids = []
+        self.items = []
+        self.actions = []
+
+    @classmethod
+    def from_rows(cls, rows):
+        """A block from (timestamp, rfid, item, action) rows; rows with an invalid timestamp are skipped."""
+        block = cls()
+        for timestamp, rfid, item, action in rows:
+            ts = parse_timestamp(timestamp)
+            if ts is not None:
+                block.append(ts, rfid, item, action)
+        return block
+
+    def __len__(self):
+        return len(self.times)
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            block = LogBlock()
+            block.times = self.times[row]
+            block.rfids = self.rfids[row]
+            block.items = self.items[row]
+            block.actions = self.actions[row]
+            return block
+        return format_timestamp(self.times[row]), self.rfids[row], self.items[row], self.actions[row]
+
+    def __iter__(self):
+        return zip(map(format_timestamp, self.times), self.rfids, self.items, self.actions)
+
+    def append(self, ts, rfid, item, action):
+        self.times.append(ts)
+        self.rfids.append(sys.intern(rfid))
+        self.items.append(sys.intern(item))
+        self.actions.append(sys.intern(action))
+
+    def extend(self, block):
+        """Append the rows of another block."""
+        self.times.extend(block.times)
+        self.rfids.extend(block.rfids)
+        self.items.extend(block.items)
+        self.actions.extend(block.actions)
+
+    def take(self, rows):
+        """A new block with the rows numbered ``rows``, in that order."""
+        block = LogBlock()
+        block.times = array("q", map(self.times.__getitem__, rows))
+        block.rfids = list(map(self.rfids.__getitem__, rows))
+        block.items = list(map(self.items.__getitem__, rows))
+        block.actions = list(map(self.actions.__getitem__, rows))
+        return block
+
+
+def parse_block(lines, block=None):
+    """Parse log lines into ``block`` (a new LogBlock if None) and return it.
+
+    Lines that cannot be parsed are skipped and counted in LINES_REJECTED.
+    """
+    started = time.perf_counter()
+    if block is None:
+        block = LogBlock()
+    before = len(block)
+    rejected = 0
+    times, rfids, items, actions = block.times, block.rfids, block.items, block.actions
+    intern = sys.intern
+    for log in lines:
+        row = parse_log_line(log)
+        if row is None:
+            rejected += 1
+            continue
+        ts, rfid, item, action = row
+        times.append(ts)
+        rfids.append(intern(rfid))
+        items.append(intern(item))
+        actions.append(intern(action))
+    LINES_PARSED.inc(len(block) - before)
+    LINES_REJECTED.inc(rejected)
+    PARSE_SECONDS.observe(time.perf_counter() - started)
+    return block
+
+
+def iter_blocks(lines, size=BLOCK_SIZE):
+    """Parse an iterable of lines (e.g. an open file) ``size`` lines at a time, yielding LogBlocks."""
+    lines = iter(lines)
+    while True:
+        chunk = list(islice(lines, size))
+        if not chunk:
+            return
+        yield parse_block(chunk)
@@ -0,0 +1,214 @@
+"""The line protocol spoken by the RFID reader (Arduino) over serial.
+
+Nothing in here imports Qt, so it is shared by the GUI and the headless
+collector (``python -m rfid collect``).
+"""
+import re
+import time
+from collections import deque
+
+import serial
+
+from rfid import metrics
+from rfid.sync import START_LOGS, END_LOGS
+
+BAUDRATE = 9600
+READ_TIMEOUT = 0.1  # Short, so a reader thread notices a stop request quickly
+MAX_LINE_LENGTH = 4096  # Longest line accepted from the device (bytes)
+SYNC_TIME_DELAY = 1.0  # Seconds the device needs between SYNC_TIME and the timestamp
+
+# Host -> device
+SCAN_NOW = b"SCAN_NOW\n"
+SYNC_LOGS = b"SYNC_LOGS\n"
+SYNC_TIME = b"SYNC_TIME\n"
+
+# Device -> host
+RFID_SCANNED = "RFID_SCANNED:"
+ENROLL_SUCCESSFUL = "ENROLL_SUCCESSFUL"
+ENROLL_FAILED = "ENROLL_FAILED"
+TIME_READY = "TIME_READY"  # Optional reply to SYNC_TIME: the device is waiting for the timestamp
+
+BYTES_RECEIVED = metrics.counter("serial_bytes_received", "Bytes read from all readers")
+LINES_RECEIVED = metrics.counter("serial_lines_received", "Device messages queued (log sync lines not included)")
+LINES_DROPPED = metrics.counter("serial_lines_dropped", "Lines dropped: queue full or line too long")
+SYNC_LINES_RECEIVED = metrics.counter("sync_lines_received", "Lines received by SYNC_LOGS transfers, markers included")
+
+
+def open_port(port, baudrate=BAUDRATE):
+    """Open a serial port by name (COM3, /dev/ttyUSB0) or pyserial URL (loop://)."""
+    return serial.serial_for_url(port, baudrate, timeout=READ_TIMEOUT)
+
+
+def time_message(now=None):
+    """The timestamp line sent after SYNC_TIME."""
+    return time.strftime("%Y-%m-%d %H:%M:%S\n", time.localtime(now)).encode()
+
+
+def normalize_item_name(item_name):
+    """Trim the name and replace runs of whitespace with a single space."""
+    return re.sub(r"\s+", " ", item_name.strip())
+
+
+def enroll_message(item_name, rfid):
+    return f"ENROLL\n{normalize_item_name(item_name)},{rfid}\n".encode()
+
+
+def scanned_rfid(line):
+    """Return the tag UID of an RFID_SCANNED line, or None for other lines."""
+    if line.startswith(RFID_SCANNED):
+        return line[len(RFID_SCANNED):].strip()
+    return None
+
+
+class LineReader:
+    """Blocking read loop over one serial port.
+
+    Bytes are framed into lines and queued (bounded, with the time they were
+    received) for ``drain``. ``on_lines`` is called once when the queue goes
+    from empty to non-empty, so the consumer handles a whole batch per call.
+    While a SYNC_LOGS transfer is active its lines go to the LogSync instead;
+    after a transfer is cancelled or times out, the rest of the dump is
+    dropped up to its END_LOGS. All callbacks run on the thread that calls
+    ``run``.
+    """
+
+    PROGRESS_INTERVAL = 0.25  # Seconds between on_sync_progress calls
+
+    def __init__(self, serial_port, on_lines, on_sync_progress=None, on_sync_finished=None,
+                 on_connection_lost=None, max_queued_lines=10000):
+        self.serial_port = serial_port
+        self.on_lines = on_lines
+        self.on_sync_progress = on_sync_progress or (lambda lines, size: None)
+        self.on_sync_finished = on_sync_finished or (lambda success, error: None)
+        self.on_connection_lost = on_connection_lost or (lambda error: None)
+        self.lines = deque(maxlen=max_queued_lines)
+        self.dropped_lines = 0
+        self._notify_pending = False
+
+        # SYNC_LOGS transfer, handled entirely on the reading thread
+        self.log_sync = None
+        self._cancel_sync = False
+        self._last_progress = 0.0
+        # A dump of an aborted transfer may still arrive: "pending" until its
+        # START_LOGS, "receiving" until its END_LOGS
+        self._aborted_transfer = None
+
+    def run(self, should_stop):
+        """Read until ``should_stop()`` returns True or the port fails."""
+        partial = b""
+        while not should_stop():
+            try:
+                # Blocks until at least one byte arrives or the port timeout expires
+                chunk = self.serial_port.read(self.serial_port.in_waiting or 1)
+            except (serial.SerialException, OSError, TypeError) as e:
+                if self.log_sync:
+                    self._end_log_sync(f"Serial Read Error: {e}")
+                if not should_stop():
+                    self.on_connection_lost(str(e))
+                return
+
+            if self.log_sync:
+                self._check_log_sync()
+
+            if not chunk:
+                continue
+            BYTES_RECEIVED.inc(len(chunk))
+
+            *complete, partial = (partial + chunk).split(b"\n")
+            if len(partial) > MAX_LINE_LENGTH:
+                partial = b""  # Garbage without a newline, drop it
+                self.dropped_lines += 1
+                LINES_DROPPED.inc()
+
+            queued = 0
+            synced = 0
+            received_at = time.time()
+            for raw in complete:
+                raw = raw.strip()
+                if not raw:
+                    continue
+                if self._aborted_transfer and self._skip_aborted(raw):
+                    continue
+                if self.log_sync and self.log_sync.feed(raw):
+                    synced += 1
+                    if self.log_sync.finished:
+                        self._end_log_sync(self.log_sync.error)
+                    continue
+                line = raw.decode("utf-8", errors="replace")
+                if len(self.lines) == self.lines.maxlen:
+                    self.dropped_lines += 1  # Oldest line is pushed out
+                    LINES_DROPPED.inc()
+                self.lines.append((received_at, line))
+                queued += 1
+
+            if synced:
+                SYNC_LINES_RECEIVED.inc(synced)
+            if queued:
+                LINES_RECEIVED.inc(queued)
+            if queued and not self._notify_pending:
+                self._notify_pending = True
+                self.on_lines()
+
+    def drain(self):
+        """Return every queued (received_at, line). Safe to call from another thread."""
+        # Clear the flag first so lines queued while draining trigger a new call
+        self._notify_pending = False
+        batch = []
+        while self.lines:
+            batch.append(self.lines.popleft())
+        return batch
+
+    def write(self, data):
+        self.serial_port.write(data)
+
+    def start_log_sync(self, log_sync):
+        """Route the next START_LOGS ... END_LOGS transfer into ``log_sync``.
+
+        Must be called before SYNC_LOGS is written to the port.
+        """
+        self._cancel_sync = False
+        self._last_progress = 0.0
+        if self._aborted_transfer == "pending":
+            self._aborted_transfer = None  # The next START_LOGS answers this request
+        self.log_sync = log_sync
+
+    def cancel_log_sync(self):
+        self._cancel_sync = True
+
+    def abort_log_sync(self, reason):
+        """Abort a running transfer after the read loop has stopped."""
+        if self.log_sync:
+            self.log_sync.abort(reason)
+            self.log_sync = None
+
+    def _check_log_sync(self):
+        if self._cancel_sync:
+            self.log_sync.abort("Cancelled")
+        elif not self.log_sync.check_timeout():
+            now = time.monotonic()
+            if self.log_sync.receiving and now - self._last_progress >= self.PROGRESS_INTERVAL:
+                self._last_progress = now
+                self.on_sync_progress(self.log_sync.lines_received, self.log_sync.bytes_received)
+            return
+        # The device keeps sending its dump; none of it is a device message
+        self._aborted_transfer = "receiving" if self.log_sync.receiving else "pending"
+        self._end_log_sync(self.log_sync.error)
+
+    def _skip_aborted(self, raw):
+        """Whether ``raw`` is part of the dump of an aborted transfer."""
+        if self._aborted_transfer == "receiving":
+            if raw == END_LOGS:
+                self._aborted_transfer = None
+            return True
+        if raw == START_LOGS:
+            self._aborted_transfer = "receiving"
+            return True
+        return False
+
+    def _end_log_sync(self, error):
+        log_sync, self.log_sync = self.log_sync, None
+        if error is None:
+            self.on_sync_progress(log_sync.lines_received, log_sync.bytes_received)
+        else:
+            log_sync.abort(error)
+        self.on_sync_finished(error is None, error or "")
@@ -0,0 +1,161 @@
+"""Host-side registry of enrolled tags: which item each tag UID belongs to.
+
+UIDs are kept as packed bytes (``E280116060000205189A3B2C`` takes 13 bytes
+instead of a 24-character string), looked up with one dict access per scan,
+and persisted in an append-only file, so enrolling a tag writes one small
+record instead of rewriting the whole registry.
+"""
+import os
+import struct
+import sys
+
+from rfid.logfile import make_temp_file
+from rfid.parsing import LogBlock
+
+MAGIC = b"RFIDTAGS1\n"
+RECORD_HEADER = struct.Struct("<BH")  # Key length, item name length (bytes)
+
+# First byte of a packed UID
+_HEX_UPPER = 0  # Even-length uppercase hex (including plain decimal digits)
+_HEX_LOWER = 1  # Even-length lowercase hex
+_TEXT = 2  # Anything else, stored as UTF-8
+
+_HEX_DIGITS = frozenset("0123456789abcdefABCDEF")
+
+
+def pack_uid(uid):
+    """Pack a UID string into bytes; ``unpack_uid`` gives the same string back."""
+    if uid and len(uid) % 2 == 0 and _HEX_DIGITS.issuperset(uid):
+        if uid == uid.upper():
+            return bytes((_HEX_UPPER,)) + bytes.fromhex(uid)
+        if uid == uid.lower():
+            return bytes((_HEX_LOWER,)) + bytes.fromhex(uid)
+    return bytes((_TEXT,)) + uid.encode("utf-8")
+
+
+def unpack_uid(key):
+    kind, data = key[0], key[1:]
+    if kind == _HEX_UPPER:
+        return data.hex().upper()
+    if kind == _HEX_LOWER:
+        return data.hex()
+    return data.decode("utf-8")
+
+
+class TagRegistry:
+    """UID -> item name for every tag known to be enrolled.
+
+    Filled from ENROLL results and from the logs (a logged scan shows the
+    item the device has for the tag). ``path=None`` keeps it in memory only.
+    """
+
+    def __init__(self, path="tags.dat"):
+        self.path = path
+        self.items = {}  # Packed UID -> item name
+        self.records = 0  # Records in the file, including overwritten ones
+        self._file = None
+        if path:
+            self.load()
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, uid):
+        return pack_uid(uid) in self.items
+
+    def get(self, uid):
+        """The item enrolled for ``uid``, or None."""
+        return self.items.get(pack_uid(uid))
+
+    def uids(self):
+        return [unpack_uid(key) for key in self.items]
+
+    def add(self, uid, item):
+        """Record that ``uid`` is enrolled as ``item``. Returns True if that is new."""
+        key = pack_uid(uid)
+        if self.items.get(key) == item:
+            return False
+        self.items[key] = sys.intern(item)
+        if self.path:
+            self._append(key, item)
+        return True
+
+    def learn_rows(self, rows):
+        """Add tags seen in log rows (a LogBlock or 4-field rows). Returns how many were new.
+
+        Only unknown tags are added: a tag enrolled from this app keeps the
+        name it was enrolled with even if older logs show another one.
+        """
+        if isinstance(rows, LogBlock):
+            latest = dict(zip(rows.rfids, rows.items))  # Columns, no timestamps to format
+        else:
+            latest = {rfid: item for _, rfid, item, _ in rows}
+        added = 0
+        for rfid, item in latest.items():
+            if rfid and item and rfid not in self:
+                self.add(rfid, item)
+                added += 1
+        return added
+
+    def load(self):
+        self.items = {}
+        self.records = 0
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return
+        if not data.startswith(MAGIC):
+            if MAGIC.startswith(data):
+                return  # Empty or cut short while it was created: nothing enrolled yet
+            raise ValueError(f"{self.path} is not a tag registry")
+
+        offset = len(MAGIC)
+        while offset + RECORD_HEADER.size <= len(data):
+            key_length, item_length = RECORD_HEADER.unpack_from(data, offset)
+            end = offset + RECORD_HEADER.size + key_length + item_length
+            if end > len(data):
+                break  # Record cut short by a crash while appending; dropped by compact()
+            key = data[offset + RECORD_HEADER.size:offset + RECORD_HEADER.size + key_length]
+            self.items[key] = sys.intern(data[end - item_length:end].decode("utf-8"))
+            self.records += 1
+            offset = end
+
+        if offset != len(data) or self.records > 2 * len(self.items) + 100:
+            self.compact()
+
+    def compact(self):
+        """Rewrite the file with one record per tag."""
+        self.close()
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, temp_path = make_temp_file(directory, ".tags-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(MAGIC)
+                f.write(b"".join(self._record(key, item) for key, item in self.items.items()))
+            os.replace(temp_path, self.path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        self.records = len(self.items)
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def _append(self, key, item):
+        if self._file is None:
+            if not os.path.exists(self.path) or os.path.getsize(self.path) < len(MAGIC):
+                # Created in one step, with the new record, so it always starts with MAGIC
+                self.compact()
+                return
+            self._file = open(self.path, "ab")
+        self._file.write(self._record(key, item))
+        self._file.flush()
+        self.records += 1
+
+    @staticmethod
+    def _record(key, item):
+        name = item.encode("utf-8")
+        return RECORD_HEADER.pack(len(key), len(name)) + key + name
@@ -0,0 +1,315 @@
+"""Log store made of size- or day-limited segments, compressed once closed.
+
+Rows are appended to an active plain-text segment. When it reaches
+``max_bytes`` or a row from another day arrives, it is closed, compressed
+(zstd if the ``zstandard`` package is installed, gzip otherwise) and a new
+one is started. ``segments.json`` lists every segment with its time range,
+so old segments are only read when asked for: ``read_new`` starts with the
+last ``initial_days`` of history and ``read_older`` loads further back a day
+at a time. Segments are picked by their time range, not their order: rows
+that arrive late for an old day go to a new segment.
+
+A sync never overwrites history: only rows that are not stored yet are
+appended. Every synced row is checked against the stored rows of the same
+day, so a gate that missed syncs for days, or whose clock was set back,
+still gets all of its rows stored. Clear Logs moves the segments to a
+``cleared-*`` folder instead of deleting them.
+"""
+import gzip
+import json
+import os
+import shutil
+import threading
+import time
+
+from rfid.logfile import make_temp_file
+from rfid.logindex import MIN_TIME, LogIndex
+from rfid.parsing import DAY, LogBlock, parse_block, parse_timestamp
+from rfid.storage import READ_SECONDS, WRITE_SECONDS, ROWS_WRITTEN, LogStore, merged_rows
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MANIFEST = "segments.json"
+
+
+def _open_compressed(path, mode):
+    """Open a closed segment for reading ("rb") or writing ("wb")."""
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise OSError(f"{path} needs the zstandard package")
+        raw = open(path, mode)
+        if mode == "rb":
+            return zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+        return zstandard.ZstdCompressor(level=10).stream_writer(raw, closefd=True)
+    return gzip.open(path, mode, compresslevel=6)
+
+
+def _in_time_order(rows, start, end=None):
+    """The rows of a LogBlock from ``start`` up to ``end`` (exclusive), sorted by time."""
+    times = rows.times
+    in_range = [row for row, ts in enumerate(times) if ts >= start and (end is None or ts < end)]
+    return rows.take(sorted(in_range, key=times.__getitem__))
+
+
+class SegmentedLogStore(LogStore):
+    """Log rows in ``directory``, one file per segment."""
+
+    def __init__(self, directory="logs", max_bytes=4 * 1024 * 1024, initial_days=7):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.initial_days = initial_days
+        self.staging_dir = directory
+        self.compressed_suffix = ".log.zst" if zstandard else ".log.gz"
+        os.makedirs(directory, exist_ok=True)
+
+        # Syncs append on a reader thread while the GUI reads
+        self._lock = threading.Lock()
+        self.manifest = self._load_manifest()
+        self.generation = None  # Manifest generation seen by read_new
+        self.position = None  # (segment ID, byte offset) read_new has read up to
+        self.loaded_since = None  # Rows from this time on have been read
+
+    # Manifest
+
+    def _load_manifest(self):
+        try:
+            with open(os.path.join(self.directory, MANIFEST), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"generation": 0, "next_id": 1, "segments": [], "last_ts": None, "latest": {}, "imported": []}
+
+    def _save_manifest(self):
+        fd, temp_path = make_temp_file(self.directory, ".segments-")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self.manifest, f)
+            os.replace(temp_path, os.path.join(self.directory, MANIFEST))
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+    def _path(self, segment):
+        return os.path.join(self.directory, segment["file"])
+
+    def _active(self):
+        segments = self.manifest["segments"]
+        return segments[-1] if segments and not segments[-1]["closed"] else None
+
+    # Writing
+
+    def replace_with_files(self, paths):
+        """Append the rows of ``paths`` that are not stored yet; history is kept, for every reader."""
+        with self._lock, WRITE_SECONDS.time(), merged_rows(paths) as rows:
+            self._append_rows(rows)
+
+    def _append_rows(self, rows):
+        last_ts = self.manifest["last_ts"]
+        latest = self.manifest["latest"]
+        latest_ts = {}  # Timestamps of the latest rows, parsed once per tag
+        late = False  # Whether rows older than stored ones were appended
+        known_day, known = None, set()  # Stored rows of the day being checked
+        active = self._active()
+        out = open(self._path(active), "ab") if active else None
+        written = 0
+        try:
+            for _, ts, row in rows:
+                if ts // DAY != known_day:
+                    if out:
+                        out.flush()  # Rows appended so far are read back too
+                    known_day, known = ts // DAY, self._stored_rows(ts // DAY)
+                if row in known:
+                    continue
+                known.add(row)
+
+                if active is None or active["bytes"] >= self.max_bytes or ts // DAY != active["day"]:
+                    if out:
+                        out.close()
+                        self._close_segment(active)
+                    active = self._new_segment(ts)
+                    out = open(self._path(active), "ab")
+
+                late = late or (last_ts is not None and ts < last_ts)
+                line = (", ".join(row) + "\n").encode("utf-8")
+                out.write(line)
+                active["bytes"] += len(line)
+                active["rows"] += 1
+                active["min_ts"] = min(active["min_ts"], ts)
+                active["max_ts"] = max(active["max_ts"], ts)
+                previous_ts = latest_ts.get(row[1])
+                if previous_ts is None and row[1] in latest:
+                    previous_ts = latest_ts[row[1]] = parse_timestamp(latest[row[1]][0])
+                if previous_ts is None or previous_ts <= ts:
+                    latest[row[1]] = row
+                    latest_ts[row[1]] = ts
+                written += 1
+            if out:
+                out.flush()
+                os.fsync(out.fileno())
+        finally:
+            if out:
+                out.close()
+        if written:
+            self.manifest["last_ts"] = max(
+                segment["max_ts"] for segment in self.manifest["segments"] if segment["rows"]
+            )
+            if late:
+                # Appended rows are not in time order; readers reload instead
+                self.manifest["generation"] += 1
+            self._save_manifest()
+        ROWS_WRITTEN.inc(written)
+
+    def _new_segment(self, ts):
+        segment_id = self.manifest["next_id"]
+        self.manifest["next_id"] += 1
+        segment = {
+            "id": segment_id, "file": f"{segment_id:06d}.log", "closed": False,
+            "day": ts // DAY, "min_ts": ts, "max_ts": ts, "rows": 0, "bytes": 0,
+        }
+        self.manifest["segments"].append(segment)
+        return segment
+
+    def _close_segment(self, segment):
+        """Compress the active segment. The plain file is removed only once the manifest points to the copy."""
+        plain = self._path(segment)
+        compressed = plain[:-len(".log")] + self.compressed_suffix
+        with open(plain, "rb") as source, _open_compressed(compressed, "wb") as target:
+            shutil.copyfileobj(source, target)
+        segment["file"] = os.path.basename(compressed)
+        segment["closed"] = True
+        self._save_manifest()
+        os.remove(plain)
+
+    def _stored_rows(self, day):
+        """The stored rows of ``day`` (days since the epoch), as a set."""
+        rows = set()
+        for segment in self.manifest["segments"]:
+            if segment["min_ts"] // DAY <= day <= segment["max_ts"] // DAY:
+                block = self._read_segment(segment)[0]
+                rows.update(block[row] for row, ts in enumerate(block.times) if ts // DAY == day)
+        return rows
+
+    # Reading
+
+    def _read_segment(self, segment, offset=0):
+        """A LogBlock of the rows of ``segment`` after byte ``offset`` (uncompressed), and the offset after them."""
+        opener = _open_compressed if segment["closed"] else open
+        with opener(self._path(segment), "rb") as f:
+            if offset:
+                if segment["closed"]:
+                    f.read(offset)  # Compressed streams can only skip forward by reading
+                else:
+                    f.seek(offset)
+            data = f.read()
+        end = data.rfind(b"\n") + 1  # Only complete lines
+        return parse_block(data[:end].decode("utf-8").splitlines()), offset + end
+
+    def read_new(self):
+        with self._lock, READ_SECONDS.time():
+            segments = self.manifest["segments"]
+            reloaded = self.manifest["generation"] != self.generation
+            if reloaded:
+                self.generation = self.manifest["generation"]
+                self.position = None
+                self.loaded_since = None
+                if segments:
+                    # Only recent history at first, from midnight; read_older loads the rest
+                    cutoff = self.manifest["last_ts"] - self.initial_days * DAY
+                    self.loaded_since = cutoff - cutoff % DAY
+                    rows = LogBlock()
+                    self.position = (self.manifest["next_id"], 0)
+                    for segment in segments:
+                        if segment["max_ts"] >= self.loaded_since or not segment["closed"]:
+                            segment_rows, offset = self._read_segment(segment)
+                            rows.extend(segment_rows)
+                            if not segment["closed"]:
+                                # Rows appended from here on are newer than everything read
+                                self.position = (segment["id"], offset)
+                    return reloaded, _in_time_order(rows, self.loaded_since)
+
+            if self.position is None:
+                if not segments:
+                    return reloaded, LogBlock()
+                # Everything was written after the last read, so it is all new
+                self.position = (segments[0]["id"], 0)
+                self.loaded_since = segments[0]["min_ts"] - segments[0]["min_ts"] % DAY
+            rows = LogBlock()
+            segment_id, offset = self.position
+            for segment in segments:
+                if segment["id"] < segment_id:
+                    continue
+                if segment["id"] > segment_id:
+                    segment_id, offset = segment["id"], 0
+                segment_rows, offset = self._read_segment(segment, offset)
+                rows.extend(segment_rows)
+            self.position = (segment_id, offset)
+            return reloaded, rows
+
+    def _older(self):
+        return [s for s in self.manifest["segments"] if self.loaded_since is not None and s["min_ts"] < self.loaded_since]
+
+    def has_older(self):
+        return bool(self._older())
+
+    def read_older(self, start=None):
+        with self._lock, READ_SECONDS.time():
+            older = self._older()
+            if not older:
+                return LogBlock()
+            if start is None:
+                # The whole day of the newest row not loaded yet
+                newest = max(min(s["max_ts"], self.loaded_since - 1) for s in older)
+                start = newest - newest % DAY
+            if start >= self.loaded_since:
+                return LogBlock()
+            rows = LogBlock()
+            for segment in older:
+                if segment["max_ts"] >= start:
+                    rows.extend(self._read_segment(segment)[0])
+            rows = _in_time_order(rows, start, self.loaded_since)
+            self.loaded_since = start
+            return rows
+
+    def query_older(self, text="", action=None, start=None, end=None):
+        # Segments have no index: every older segment in the time range is read
+        with self._lock, READ_SECONDS.time():
+            rows = LogBlock()
+            for segment in self._older():
+                if (start is None or segment["max_ts"] >= start) and (end is None or segment["min_ts"] <= end):
+                    rows.extend(self._read_segment(segment)[0])
+            rows = _in_time_order(rows, MIN_TIME, self.loaded_since)
+        index = LogIndex()
+        index.append_rows(rows)
+        matching = index.filter(text, action, start, end)
+        return rows if matching is None else rows.take(matching)
+
+    def latest_rows(self):
+        return [tuple(row) for row in self.manifest["latest"].values()]
+
+    def clear(self):
+        """Hide every stored row. The segments are moved aside, not deleted."""
+        with self._lock:
+            segments = self.manifest["segments"]
+            if segments:
+                archive = os.path.join(self.directory, time.strftime("cleared-%Y%m%d-%H%M%S"))
+                os.makedirs(archive, exist_ok=True)
+                for segment in segments:
+                    os.replace(self._path(segment), os.path.join(archive, segment["file"]))
+            self.manifest.update(segments=[], last_ts=None, latest={})
+            self.manifest["generation"] += 1
+            self._save_manifest()
+
+    def import_text_file(self, path):
+        """Append an existing data.txt, once. Returns the number of rows imported."""
+        path = os.path.abspath(path)
+        if not os.path.exists(path) or path in self.manifest["imported"]:
+            return 0
+        with self._lock:
+            before = sum(segment["rows"] for segment in self.manifest["segments"])
+            with merged_rows({None: path}) as rows:
+                self._append_rows(rows)
+            self.manifest["imported"].append(path)
+            self._save_manifest()
+            return sum(segment["rows"] for segment in self.manifest["segments"]) - before
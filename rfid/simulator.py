@@ -0,0 +1,286 @@
+"""A simulated RFID reader for testing and benchmarking without an Arduino.
+
+The simulator speaks the same line protocol as the device firmware:
+
+- ``SCAN_NOW`` is answered with ``RFID_SCANNED:<uid>`` after ``scan_delay``.
+- ``ENROLL`` + ``item,uid`` is answered with ``ENROLL_SUCCESSFUL`` (or
+  ``ENROLL_FAILED`` for malformed requests and ``enroll_failure_rate``).
+- ``SYNC_TIME`` is answered with ``TIME_READY`` (unless ``time_ready`` is
+  False, like older firmware) and the next line sets the device clock.
+- ``SYNC_LOGS`` dumps the device log between ``START_LOGS`` and ``END_LOGS``,
+  optionally throttled to ``bytes_per_second`` (9600 baud is ~960).
+
+``scan_burst`` makes tags pass the gate, sending ``RFID_SCANNED`` lines at a
+given rate and adding Entry/Exit rows to the device log.
+
+The host connects through a TCP socket (``socket://127.0.0.1:PORT``, which
+``open_port`` accepts like a COM port) or, on Linux and macOS, a pty whose
+path is opened like ``/dev/ttyUSB0``. From the command line::
+
+    python -m rfid simulate --tcp 7777 --log-lines 100000
+"""
+import os
+import random
+import select
+import socket
+import threading
+import time
+
+from rfid.parsing import TIMESTAMP_FORMAT
+
+LOG_HEADER = b"Timestamp, RFID Number, Tool Name, Action"
+ITEM_NAMES = [
+    "Torque Wrench", "Multimeter", "Cordless Drill", "Socket Set", "Oscilloscope",
+    "Soldering Iron", "Caliper", "Impact Driver", "Heat Gun", "Crimping Tool",
+]
+WRITE_CHUNK_SIZE = 4096  # Bytes per write while dumping logs
+
+
+def make_tags(count, seed=None):
+    """``count`` distinct 10-digit tag UIDs, like the ones the reader reports."""
+    rng = random.Random(seed)
+    return [str(uid) for uid in rng.sample(range(10 ** 9, 10 ** 10), count)]
+
+
+def make_items(tags):
+    """An item name for every tag UID."""
+    return {tag: ITEM_NAMES[i % len(ITEM_NAMES)] + f" #{i + 1}" for i, tag in enumerate(tags)}
+
+
+def generate_log_lines(count, tags, start=None, interval=30, seed=None, checked_out=None):
+    """``count`` device log lines (bytes, without newlines) over ``tags``.
+
+    Every tag alternates between Exit and Entry, one event every
+    ``interval`` seconds starting at ``start`` (epoch seconds, UTC). The tags
+    that end up checked out are left in ``checked_out`` if it is given.
+    """
+    rng = random.Random(seed)
+    start = time.time() - count * interval if start is None else start
+    items = make_items(tags)
+    checked_out = set() if checked_out is None else checked_out
+    lines = []
+    for i in range(count):
+        tag = rng.choice(tags)
+        action = "Entry" if tag in checked_out else "Exit"
+        if action == "Exit":
+            checked_out.add(tag)
+        else:
+            checked_out.discard(tag)
+        timestamp = time.strftime(TIMESTAMP_FORMAT, time.gmtime(start + i * interval))
+        lines.append(f"{timestamp}, {tag}, {items[tag]}, {action}".encode())
+    return lines
+
+
+class SocketTransport:
+    """One accepted TCP connection."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.conn.setblocking(True)
+
+    def read(self, timeout):
+        ready, _, _ = select.select([self.conn], [], [], timeout)
+        if not ready:
+            return b""
+        data = self.conn.recv(4096)
+        if not data:
+            raise ConnectionError("Host closed the connection")
+        return data
+
+    def write(self, data):
+        self.conn.sendall(data)
+
+    def close(self):
+        self.conn.close()
+
+
+class PtyTransport:
+    """The master side of a pseudo terminal (POSIX only).
+
+    The slave side stays open too, so reading does not fail while the host
+    has not opened the device yet.
+    """
+
+    def __init__(self, fd, slave_fd):
+        self.fd = fd
+        self.slave_fd = slave_fd
+
+    def read(self, timeout):
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        return os.read(self.fd, 4096) if ready else b""
+
+    def write(self, data):
+        view = memoryview(data)
+        while view:
+            select.select([], [self.fd], [])
+            view = view[os.write(self.fd, view):]
+
+    def close(self):
+        os.close(self.fd)
+        os.close(self.slave_fd)
+
+
+class SimulatedReader:
+    """The device side of one reader. ``serve`` runs it on a transport."""
+
+    def __init__(self, tags=None, log_lines=1000, bytes_per_second=None, scan_delay=0.05,
+                 enroll_failure_rate=0.0, time_ready=True, seed=None):
+        self.rng = random.Random(seed)
+        self.tags = tags or make_tags(50, seed)
+        self.items = make_items(self.tags)
+        self.checked_out = set()
+        self.log = generate_log_lines(log_lines, self.tags, seed=seed, checked_out=self.checked_out)
+        self.bytes_per_second = bytes_per_second
+        self.scan_delay = scan_delay
+        self.enroll_failure_rate = enroll_failure_rate
+        self.time_ready = time_ready
+
+        self.enrolled = {}  # UID -> item name
+        self.clock = None  # Last timestamp received after SYNC_TIME
+        self.commands = []  # Every command line received, in order
+        self.transport = None
+        self._write_lock = threading.Lock()
+        self._expect = None  # Next line is the "item,uid" of an ENROLL or the time of a SYNC_TIME
+        self._stop = threading.Event()
+
+    def serve(self, transport):
+        """Answer commands on ``transport`` until ``stop`` or the host goes away."""
+        self.transport = transport
+        partial = b""
+        try:
+            while not self._stop.is_set():
+                chunk = transport.read(0.1)
+                if not chunk:
+                    continue
+                *complete, partial = (partial + chunk).split(b"\n")
+                for raw in complete:
+                    self.handle(raw.strip().decode("utf-8", errors="replace"))
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self.transport = None
+            transport.close()
+
+    def stop(self):
+        self._stop.set()
+
+    def send(self, *lines):
+        """Write lines to the host; dropped if no host is connected."""
+        data = b"".join(line + b"\n" for line in lines)
+        with self._write_lock:
+            if self.transport is None:
+                return
+            try:
+                self.transport.write(data)
+            except OSError:
+                pass  # Host went away; serve notices on its next read
+
+    def handle(self, line):
+        if not line:
+            return
+        self.commands.append(line)
+        expect, self._expect = self._expect, None
+        if expect == "ENROLL":
+            self._enroll(line)
+        elif expect == "SYNC_TIME":
+            self.clock = line
+        elif line == "SCAN_NOW":
+            time.sleep(self.scan_delay)  # Waiting for a tag, like the firmware does
+            self.send(b"RFID_SCANNED:" + self.rng.choice(self.tags).encode())
+        elif line in ("ENROLL", "SYNC_TIME"):
+            self._expect = line
+            if line == "SYNC_TIME" and self.time_ready:
+                self.send(b"TIME_READY")
+        elif line == "SYNC_LOGS":
+            self.dump_logs()
+
+    def _enroll(self, line):
+        item, sep, uid = line.rpartition(",")
+        if not sep or not item or not uid or self.rng.random() < self.enroll_failure_rate:
+            self.send(b"ENROLL_FAILED")
+            return
+        self.enrolled[uid] = item
+        self.items[uid] = item
+        self.send(b"ENROLL_SUCCESSFUL")
+
+    def dump_logs(self):
+        """Send START_LOGS, the header and every log line, then END_LOGS."""
+        data = b"\n".join([b"START_LOGS", LOG_HEADER, *self.log, b"END_LOGS", b""])
+        started = time.monotonic()
+        for offset in range(0, len(data), WRITE_CHUNK_SIZE):
+            if self._stop.is_set():
+                return
+            if self.bytes_per_second:
+                delay = started + offset / self.bytes_per_second - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            with self._write_lock:
+                self.transport.write(data[offset:offset + WRITE_CHUNK_SIZE])
+
+    def scan_burst(self, count, rate=None):
+        """``count`` tags pass the gate, ``rate`` per second (None: all at once).
+
+        Each scan is sent as RFID_SCANNED and logged as the tag's next
+        Entry/Exit. Blocks until the burst has been sent.
+        """
+        started = time.monotonic()
+        lines = []
+        for i in range(count):
+            tag = self.rng.choice(self.tags)
+            lines.append(b"RFID_SCANNED:" + tag.encode())
+            self._log_scan(tag)
+            if rate:
+                delay = started + i / rate - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                self.send(*lines)
+                lines = []
+        if lines:
+            self.send(*lines)
+
+    def _log_scan(self, tag):
+        if tag in self.checked_out:
+            action = "Entry"
+            self.checked_out.discard(tag)
+        else:
+            action = "Exit"
+            self.checked_out.add(tag)
+        item = self.items.get(tag, "Unknown Tool")
+        timestamp = time.strftime(TIMESTAMP_FORMAT, time.gmtime())
+        self.log.append(f"{timestamp}, {tag}, {item}, {action}".encode())
+
+
+def serve_tcp(reader, host="127.0.0.1", port=0):
+    """Serve ``reader`` to one TCP client at a time on a daemon thread.
+
+    Returns the ``socket://`` URL to pass to ``open_port``.
+    """
+    server = socket.create_server((host, port))
+    url = f"socket://{host}:{server.getsockname()[1]}"
+
+    def accept_loop():
+        with server:
+            server.settimeout(0.2)
+            while not reader._stop.is_set():
+                try:
+                    conn, _ = server.accept()
+                except socket.timeout:
+                    continue
+                reader.serve(SocketTransport(conn))
+
+    threading.Thread(target=accept_loop, name="simulated-reader", daemon=True).start()
+    return url
+
+
+def serve_pty(reader):
+    """Serve ``reader`` on a new pty on a daemon thread (POSIX only).
+
+    Returns the device path to pass to ``open_port``.
+    """
+    import tty
+
+    master, slave = os.openpty()
+    tty.setraw(slave)  # No echo or newline translation, like a real serial port
+    path = os.ttyname(slave)
+    threading.Thread(target=reader.serve, args=(PtyTransport(master, slave),), name="simulated-reader", daemon=True).start()
+    return path
@@ -0,0 +1,446 @@
+import heapq
+import json
+import os
+import re
+import shutil
+import sqlite3
+import time
+from contextlib import ExitStack, contextmanager
+from operator import itemgetter
+
+from rfid import metrics
+from rfid.logfile import LogTail, make_temp_file
+from rfid.parsing import DAY, LogBlock, format_timestamp, iter_blocks, parse_block
+
+INSERT_BATCH_SIZE = 10000  # Rows per executemany call during bulk inserts
+
+READ_SECONDS = metrics.histogram("store_read_seconds", "Time to read new rows from the log store")
+WRITE_SECONDS = metrics.histogram("store_write_seconds", "Time to replace the stored logs after a sync")
+ROWS_WRITTEN = metrics.counter("store_rows_written", "Rows written to the log store")
+
+
+class LogStore:
+    """Where log rows live.
+
+    A row is a ``(timestamp, rfid, item, action)`` tuple of strings; stores
+    return rows read from disk as a LogBlock, which iterates as such rows and
+    also has the timestamps as epoch seconds. Stores are created and read on
+    the GUI thread; ``replace_with_files`` may be called from the serial
+    reader thread when a log sync completes.
+    """
+
+    staging_dir = "."  # Where a log sync stages its temp file
+
+    def read_new(self):
+        """Return ``(reloaded, rows)`` with the rows added since the last call.
+
+        ``reloaded`` is True when the rows start from the beginning and
+        anything loaded earlier must be discarded.
+        """
+        raise NotImplementedError
+
+    def replace_with_files(self, paths):
+        """Store the complete logs of the readers that took part in a sync.
+
+        ``paths`` maps reader IDs to text files with each reader's log. The
+        stored rows of those readers are replaced; rows of readers that did
+        not take part (e.g. an unplugged gate) are kept. Rows from several
+        files are merged in timestamp order. The store may move the files.
+        """
+        raise NotImplementedError
+
+    def has_older(self):
+        """True if rows older than those returned by ``read_new`` are stored."""
+        return False
+
+    def read_older(self, start=None):
+        """Load rows older than those read so far, back to ``start`` (epoch
+        seconds) or one step back if ``start`` is None. Oldest first."""
+        return []
+
+    def query_older(self, text="", action=None, start=None, end=None):
+        """The rows older than those read so far (see ``has_older``) that match
+        ``LogIndex.filter(text, action, start, end)``, oldest first."""
+        return LogBlock()
+
+    def latest_rows(self):
+        """The newest row of every tag, also for tags that ``read_new`` has not
+        returned yet (stores that load history lazily). Empty otherwise."""
+        return []
+
+    def clear(self):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class TextLogStore(LogStore):
+    """The original comma-separated data.txt file.
+
+    The text has no room for the reader a row came from, so each reader's
+    last synced log is kept in ``data.txt.readers/`` and data.txt is rewritten
+    as their merge after every sync.
+    """
+
+    PREVIOUS = "_previous.txt"  # data.txt from before logs were kept per reader
+
+    def __init__(self, path="data.txt"):
+        self.path = path
+        self.tail = LogTail(path)
+        self.staging_dir = os.path.dirname(os.path.abspath(path))  # Same disk, so os.replace works
+        self.readers_dir = path + ".readers"
+
+    def read_new(self):
+        with READ_SECONDS.time():
+            try:
+                reloaded, lines = self.tail.read_new()
+            except FileNotFoundError:
+                return True, LogBlock()
+            return reloaded, parse_block(lines)
+
+    def replace_with_files(self, paths):
+        with WRITE_SECONDS.time():
+            os.makedirs(self.readers_dir, exist_ok=True)
+            previous = os.path.join(self.readers_dir, self.PREVIOUS)
+            if not os.listdir(self.readers_dir) and os.path.exists(self.path):
+                os.replace(self.path, previous)
+            for reader_id, path in paths.items():
+                os.replace(path, self._reader_path(reader_id))
+            if os.path.exists(previous):
+                self._drop_resent(previous, paths)
+
+            stored = {name: os.path.join(self.readers_dir, name) for name in os.listdir(self.readers_dir)}
+            with merged_rows(stored) as rows:
+                self._write_rows(self.path, (row for _, _, row in rows))
+
+    def _reader_path(self, reader_id):
+        name = re.sub(r"[^\w.-]+", "_", str(reader_id)).strip("_") or "reader"
+        return os.path.join(self.readers_dir, name + ".txt")
+
+    def _drop_resent(self, previous, paths):
+        """Remove the rows of ``previous`` that a reader has sent again."""
+        synced = {reader_id: self._reader_path(reader_id) for reader_id in paths}
+        with merged_rows(synced) as rows:
+            resent = {row for _, _, row in rows}
+        with merged_rows({None: previous}) as rows:
+            kept = [row for _, _, row in rows if row not in resent]
+        if kept:
+            self._write_rows(previous, kept)
+        else:
+            os.remove(previous)
+
+    def _write_rows(self, path, rows):
+        """Replace ``path`` with ``rows`` in one step."""
+        fd, temp_path = make_temp_file(self.staging_dir, ".merge-")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.writelines(", ".join(row) + "\n" for row in rows)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+    def clear(self):
+        # Overwrite data.txt with an empty file, and forget the readers' logs
+        with open(self.path, "w") as file:
+            file.truncate(0)  # Clears file content
+        shutil.rmtree(self.readers_dir, ignore_errors=True)
+        self.tail.reset()
+
+
+class SQLiteLogStore(LogStore):
+    """Logs in an SQLite database in WAL mode, with indexes for filtering.
+
+    ``ts`` holds the timestamp as epoch seconds (NULL if the device sent
+    something unparseable) so time ranges use the index; the original text
+    is kept in ``timestamp``. ``reader`` is the reader a row was synced from
+    (NULL for rows imported from data.txt or synced by older versions).
+    ``read_new`` starts with the last ``initial_days`` of history and
+    ``read_older`` loads further back a day at a time, so the GUI never has
+    to hold years of logs in memory. Writes use their own connection so the
+    GUI can keep reading while a sync is being committed.
+
+    The RFID, item and action columns are indexed (with the time) so
+    ``query_older`` can search years of history that is not loaded.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS logs (
+            id INTEGER PRIMARY KEY,
+            ts INTEGER,
+            timestamp TEXT NOT NULL,
+            rfid TEXT NOT NULL,
+            item TEXT NOT NULL,
+            action TEXT NOT NULL,
+            reader TEXT
+        );
+        CREATE INDEX IF NOT EXISTS logs_ts ON logs (ts);
+        CREATE INDEX IF NOT EXISTS logs_rfid ON logs (rfid, ts);
+        CREATE INDEX IF NOT EXISTS logs_item ON logs (item, ts);
+        CREATE INDEX IF NOT EXISTS logs_action ON logs (action, ts);
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+    """
+
+    def __init__(self, path="logs.db", initial_days=7):
+        self.path = path
+        self.initial_days = initial_days
+        self.staging_dir = os.path.dirname(os.path.abspath(path))
+        self.conn = self._connect()
+        self.conn.executescript(self.SCHEMA)
+        if "reader" not in {column[1] for column in self.conn.execute("PRAGMA table_info(logs)")}:
+            self.conn.execute("ALTER TABLE logs ADD COLUMN reader TEXT")  # Databases from before per-reader syncs
+        self.conn.execute("CREATE INDEX IF NOT EXISTS logs_reader ON logs (reader)")
+        self.last_id = 0
+        self.generation = None
+        self.reload_id = 0  # Highest row ID at the last reload; newer rows come through read_new
+        self.loaded_from = None  # Rows up to reload_id from this time on have been read
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _generation(self, conn):
+        row = conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()
+        return row[0] if row else "0"
+
+    def _bump_generation(self, conn):
+        # Readers compare the generation to detect that rows were replaced
+        conn.execute(
+            "INSERT INTO meta (key, value) VALUES ('generation', '1') "
+            "ON CONFLICT (key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+        )
+
+    def read_new(self):
+        started = time.perf_counter()
+        generation = self._generation(self.conn)
+        reloaded = generation != self.generation
+        rows = LogBlock()
+        if reloaded:
+            self.generation = generation
+            self.reload_id = self.conn.execute("SELECT MAX(id) FROM logs").fetchone()[0] or 0
+            self.last_id = self.reload_id
+            newest = self.conn.execute("SELECT MAX(ts) FROM logs").fetchone()[0]
+            self.loaded_from = None
+            if newest is not None:
+                # Only recent history at first, from midnight; read_older loads the rest
+                cutoff = newest - self.initial_days * DAY
+                self.loaded_from = cutoff - cutoff % DAY
+                self._read_rows(rows, "ts >= ? AND id <= ?", (self.loaded_from, self.reload_id))
+
+        # Rows without a valid timestamp (e.g. a header imported by an older
+        # version) are not shown
+        for row_id, ts, rfid, item, action in self.conn.execute(
+            "SELECT id, ts, rfid, item, action FROM logs WHERE id > ? ORDER BY id", (self.last_id,)
+        ):
+            self.last_id = row_id
+            if ts is not None:
+                rows.append(ts, rfid, item, action)
+        READ_SECONDS.observe(time.perf_counter() - started)
+        return reloaded, rows
+
+    def _read_rows(self, rows, condition, params):
+        for ts, rfid, item, action in self.conn.execute(
+            f"SELECT ts, rfid, item, action FROM logs WHERE {condition} ORDER BY ts, id", params
+        ):
+            rows.append(ts, rfid, item, action)
+
+    def has_older(self):
+        return self.loaded_from is not None and self.conn.execute(
+            "SELECT 1 FROM logs WHERE ts < ? AND id <= ? LIMIT 1", (self.loaded_from, self.reload_id)
+        ).fetchone() is not None
+
+    def read_older(self, start=None):
+        rows = LogBlock()
+        if self.loaded_from is None:
+            return rows
+        with READ_SECONDS.time():
+            if start is None:
+                # The whole day of the newest row not loaded yet
+                newest = self.conn.execute(
+                    "SELECT MAX(ts) FROM logs WHERE ts < ? AND id <= ?", (self.loaded_from, self.reload_id)
+                ).fetchone()[0]
+                if newest is None:
+                    return rows
+                start = newest - newest % DAY
+            if start >= self.loaded_from:
+                return rows
+            self._read_rows(rows, "ts >= ? AND ts < ? AND id <= ?", (start, self.loaded_from, self.reload_id))
+            self.loaded_from = start
+        return rows
+
+    def query_older(self, text="", action=None, start=None, end=None):
+        rows = LogBlock()
+        if self.loaded_from is None:
+            return rows
+        conditions, params = ["ts < ?", "id <= ?"], [self.loaded_from, self.reload_id]
+        if start is not None:
+            conditions.append("ts >= ?")
+            params.append(start)
+        if end is not None:
+            conditions.append("ts <= ?")
+            params.append(end)
+        if action is not None:
+            conditions.append("action = ?")
+            params.append(action)
+        if text:
+            # Match the distinct values like LogIndex does, then look the rows
+            # up through the rfid and item indexes
+            needle = text.casefold()
+            rfids = [rfid for (rfid,) in self.conn.execute("SELECT DISTINCT rfid FROM logs") if needle in rfid.casefold()]
+            items = [item for (item,) in self.conn.execute("SELECT DISTINCT item FROM logs") if needle in item.casefold()]
+            if not rfids and not items:
+                return rows
+            conditions.append(
+                "(rfid IN (SELECT value FROM json_each(?)) OR item IN (SELECT value FROM json_each(?)))"
+            )
+            params += [json.dumps(rfids), json.dumps(items)]
+        with READ_SECONDS.time():
+            self._read_rows(rows, " AND ".join(conditions), params)
+        return rows
+
+    def latest_rows(self):
+        # SQLite takes the other columns from the row with the MAX(ts)
+        return [
+            (format_timestamp(ts), rfid, item, action)
+            for rfid, item, action, ts in self.conn.execute(
+                "SELECT rfid, item, action, MAX(ts) FROM logs WHERE ts IS NOT NULL GROUP BY rfid"
+            )
+        ]
+
+    def insert_rows(self, conn, rows):
+        """Insert (reader ID, epoch seconds, 4-field row) entries in batches. The caller owns the transaction."""
+        batch = []
+        for reader_id, ts, (timestamp, rfid, item, action) in rows:
+            batch.append((ts, timestamp, rfid, item, action, reader_id))
+            if len(batch) >= INSERT_BATCH_SIZE:
+                self._insert_batch(conn, batch)
+                batch = []
+        if batch:
+            self._insert_batch(conn, batch)
+
+    def _insert_batch(self, conn, batch):
+        conn.executemany(
+            "INSERT INTO logs (ts, timestamp, rfid, item, action, reader) VALUES (?, ?, ?, ?, ?, ?)", batch
+        )
+        ROWS_WRITTEN.inc(len(batch))
+
+    def replace_with_files(self, paths):
+        with WRITE_SECONDS.time():
+            self._replace_with_files(paths)
+
+    def _replace_with_files(self, paths):
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for reader_id in paths:
+                    conn.execute("DELETE FROM logs WHERE reader IS ?", (reader_id,))
+                with merged_rows(paths) as rows:
+                    self.insert_rows(conn, rows)
+                if conn.execute("SELECT 1 FROM logs WHERE reader IS NULL LIMIT 1").fetchone():
+                    # Rows stored before syncs were kept per reader, which a reader sent again
+                    conn.execute(
+                        "DELETE FROM logs WHERE reader IS NULL AND EXISTS (SELECT 1 FROM logs AS synced "
+                        "WHERE synced.rfid = logs.rfid AND synced.ts = logs.ts AND synced.item = logs.item "
+                        "AND synced.action = logs.action AND synced.reader IS NOT NULL)"
+                    )
+                self._bump_generation(conn)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+
+    def clear(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        self.conn.execute("DELETE FROM logs")
+        self._bump_generation(self.conn)
+        self.conn.execute("COMMIT")
+
+    def import_text_file(self, path):
+        """Copy an existing data.txt into the database, once.
+
+        Returns the number of rows imported; 0 if the file is missing or was
+        imported before.
+        """
+        if not os.path.exists(path):
+            return 0
+        key = "imported:" + os.path.abspath(path)
+        if self.conn.execute("SELECT 1 FROM meta WHERE key = ?", (key,)).fetchone():
+            return 0
+
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            before = self.conn.execute("SELECT COUNT(*) FROM logs").fetchone()[0]
+            with open(path, "r", encoding="utf-8") as log_file:
+                self.insert_rows(self.conn, ((None, ts, row) for ts, row in _iter_rows(log_file)))
+            count = self.conn.execute("SELECT COUNT(*) FROM logs").fetchone()[0] - before
+            self.conn.execute("INSERT INTO meta (key, value) VALUES (?, ?)", (key, str(count)))
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        return count
+
+    def close(self):
+        self.conn.close()
+
+
+def _iter_rows(lines):
+    """``(epoch seconds, row)`` pairs of a log file, with normalized timestamps,
+    parsed a block at a time. The seconds come from the block's columns, so
+    no timestamp is parsed again."""
+    for block in iter_blocks(lines):
+        yield from zip(block.times, block)
+
+
+def open_log_store(backend="sqlite", text_path="data.txt", db_path="logs.db", segments_dir="logs"):
+    """Open the configured log store.
+
+    The SQLite and segment stores import ``text_path`` the first time they
+    see it, so existing stations keep their history.
+    """
+    if backend == "text":
+        return TextLogStore(text_path)
+    if backend == "segments":
+        from rfid.segments import SegmentedLogStore
+
+        store = SegmentedLogStore(segments_dir)
+        store.import_text_file(text_path)
+        return store
+    if backend == "sqlite":
+        store = SQLiteLogStore(db_path)
+        store.import_text_file(text_path)
+        return store
+    raise ValueError(f"Unknown log store backend: {backend}")
+
+
+@contextmanager
+def merged_rows(paths):
+    """Yield an iterator over the ``(reader ID, epoch seconds, row)`` entries
+    of several log files (reader ID -> path) in timestamp order.
+
+    Each file is already in order (it is one device's log), so a heap merge
+    streams them without loading everything into memory.
+    """
+    with ExitStack() as stack:
+        streams = [
+            _entries(reader_id, stack.enter_context(open(path, "r", encoding="utf-8")))
+            for reader_id, path in paths.items()
+        ]
+        if len(streams) == 1:
+            yield streams[0]
+        else:
+            yield heapq.merge(*streams, key=itemgetter(1))
+
+
+def _entries(reader_id, lines):
+    for ts, row in _iter_rows(lines):
+        yield reader_id, ts, row
@@ -0,0 +1,173 @@
+import os
+import sqlite3
+import threading
+import time
+
+from rfid import metrics
+from rfid.logfile import make_temp_file
+
+START_LOGS = b"START_LOGS"
+END_LOGS = b"END_LOGS"
+
+SYNC_SECONDS = metrics.histogram("sync_seconds", "SYNC_LOGS transfer time, START_LOGS to staged")
+SYNCS_FAILED = metrics.counter("syncs_failed", "SYNC_LOGS transfers that failed or were cancelled")
+SYNCS_COMPLETED = metrics.counter("syncs_completed", "SYNC_LOGS transfers staged completely")
+
+
+class SyncGroup:
+    """The SYNC_LOGS transfers of all connected readers, committed together.
+
+    Every device sends its complete log, so once all transfers are staged
+    they replace the stored rows of those readers. Rows of readers that are
+    not connected are kept. If any transfer fails, nothing is committed.
+    Members finish on their own reader threads; the last one to finish does
+    the commit.
+    """
+
+    def __init__(self, store, size=1):
+        self.store = store
+        self.size = size
+        self.staged_paths = {}  # Reader ID -> staged file
+        self.failed = False
+        self._finished = 0
+        self._lock = threading.Lock()
+
+    def member_staged(self, reader_id, path):
+        """Hand over a complete staged transfer. Returns an error message or None."""
+        with self._lock:
+            self.staged_paths[reader_id] = path
+            self._finished += 1
+            if self._finished < self.size:
+                return None  # Committed by the last member
+            failed = self.failed
+
+        try:
+            if failed:
+                return "Log sync failed on another reader"
+            self.store.replace_with_files(self.staged_paths)
+            return None
+        except (OSError, sqlite3.Error) as e:
+            return f"Could not save logs: {e}"
+        finally:
+            self._remove_staged()
+
+    def member_failed(self):
+        with self._lock:
+            self.failed = True
+            self._finished += 1
+            last = self._finished == self.size
+        if last:
+            self._remove_staged()
+
+    def _remove_staged(self):
+        for path in self.staged_paths.values():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass  # Moved into place by the store
+
+
+class LogSync:
+    """Receives one SYNC_LOGS transfer and stages it on disk.
+
+    Lines between START_LOGS and END_LOGS are buffered and written to a temp
+    file in ``chunk_size`` blocks. On END_LOGS the temp file is handed to the
+    ``group``, which replaces the stored rows of ``reader_id`` in one step, so
+    a failed or cancelled sync never leaves half of a transfer behind.
+    """
+
+    def __init__(self, store, group=None, reader_id=None, inactivity_timeout=10.0, chunk_size=256 * 1024):
+        self.group = group or SyncGroup(store)
+        self.reader_id = reader_id
+        self.inactivity_timeout = inactivity_timeout
+        self.chunk_size = chunk_size
+
+        self.receiving = False
+        self.finished = False
+        self.error = None
+        self.lines_received = 0
+        self.bytes_received = 0
+        self.last_activity = time.monotonic()
+        self.started = None  # perf_counter() at START_LOGS
+
+        self._buffer = []
+        self._buffered = 0
+        fd, self.temp_path = make_temp_file(store.staging_dir, ".sync-")  # The text store moves it into place
+        self._file = os.fdopen(fd, "wb")
+
+    def feed(self, raw):
+        """Consume one framed line (bytes, without the newline).
+
+        Returns False if the line is not part of the transfer, i.e. it arrived
+        before START_LOGS and should be handled as a normal device message.
+        """
+        if self.finished:
+            return False
+        if not self.receiving:
+            if raw == START_LOGS:
+                self.receiving = True
+                self.started = time.perf_counter()
+                self.last_activity = time.monotonic()
+                return True
+            return False  # Not transfer activity: a busy gate must not hold off the timeout
+
+        self.last_activity = time.monotonic()
+
+        if raw == END_LOGS:
+            self._commit()
+            return True
+
+        self._buffer.append(raw)
+        self._buffered += len(raw) + 1
+        self.lines_received += 1
+        self.bytes_received += len(raw) + 1
+        if self._buffered >= self.chunk_size:
+            self._flush()
+        return True
+
+    def check_timeout(self):
+        """Abort the transfer if the device has been silent for too long."""
+        if self.finished:
+            return False
+        if time.monotonic() - self.last_activity > self.inactivity_timeout:
+            self.abort(f"No data from device for {self.inactivity_timeout:g}s")
+            return True
+        return False
+
+    def abort(self, reason):
+        """Stop the transfer and discard everything received so far."""
+        if self.finished:
+            return
+        self.finished = True
+        self.error = reason
+        self._buffer = []
+        SYNCS_FAILED.inc()
+        try:
+            self._file.close()
+        finally:
+            try:
+                os.remove(self.temp_path)
+            except FileNotFoundError:
+                pass
+            self.group.member_failed()
+
+    def _flush(self):
+        if self._buffer:
+            self._buffer.append(b"")  # Trailing newline after the last line
+            self._file.write(b"\n".join(self._buffer))
+            self._buffer = []
+            self._buffered = 0
+
+    def _commit(self):
+        try:
+            self._flush()
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+        except OSError as e:
+            self.abort(f"Could not save logs: {e}")
+            return
+        self.finished = True
+        SYNCS_COMPLETED.inc()
+        SYNC_SECONDS.observe(time.perf_counter() - self.started)
+        self.error = self.group.member_staged(self.reader_id, self.temp_path)